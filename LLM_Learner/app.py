@@ -1,15 +1,16 @@
 import streamlit as st
-from datetime import datetime
 import os
 from typing import List, Dict
-import base64
-import requests
-import json
+import sys
 
-# Enable file handling imports
-import PyPDF2
-import io
-import docx # type: ignore
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from learner import TutorService, current_concept, browser_session_id
+from learner import get_icons
+from learner import inject_theme, render_transcript
+from learner import METRICS_PANEL, span, stage_stats, prometheus_text
+from learner import SESSION_TOKEN_BUDGET
+from learner import PROMPT_CACHING, supports_system_role
 
 # Configure the page
 st.set_page_config(
@@ -19,10 +20,22 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_service() -> TutorService:
+    """One tutor engine per server process, shared by every session and rerun"""
+    return TutorService()
+
+service = get_service()
+
 # Initialize session state
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "session_id" not in st.session_state:
+    # Kept in a browser cookie so a reload or a different server process finds
+    # the same session, while a shared link does not
+    st.session_state.session_id = browser_session_id()
 
+if "messages" not in st.session_state:
+    # Rehydrate from the session store the first time this session is seen
+    st.session_state.messages = service.load_messages(st.session_state.session_id)
 
 if "hf_api_key" not in st.session_state:
     st.session_state.hf_api_key = ""
@@ -47,57 +60,63 @@ if "hf_api_key" not in st.session_state:
 #         return f"Error reading file: {str(e)}"
 
 
-def get_llm_response(messages: List[Dict[str, str]]) -> str:
-    """Get response from OpenRouter LLM (Gemma 3n)"""
+def current_api_key():
+    """The OpenRouter key entered in the Configuration section, if any"""
+    return st.session_state.openrouter_api_key.strip() if "openrouter_api_key" in st.session_state else None
+
+def get_llm_response(messages: List[Dict[str, str]], tool: str = "Chat") -> str:
+    """Get response from OpenRouter LLM (Gemma 3n); ``tool`` is what the tokens are booked to"""
     try:
-        api_key = st.session_state.openrouter_api_key.strip() if "openrouter_api_key" in st.session_state else None
+        api_key = current_api_key()
         if not api_key:
             return "Error: Please enter your OpenRouter API key in the sidebar."
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            # Optionally add Referer and X-Title if you want
-        }
-        payload = {
-            "model": "google/gemma-3n-e4b-it:free",
-            "messages": [
-                {"role": m["role"], "content": m["content"]} for m in messages
-            ]
-        }
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
-        data = response.json()
-        # OpenRouter returns choices[0].message.content
-        return data["choices"][0]["message"]["content"]
+        return service.complete(api_key, st.session_state.session_id, messages, tool)
     except Exception as e:
         import traceback
         return f"Error: {str(e)}\nTraceback:\n{traceback.format_exc()}"
 
+def stream_llm_response(messages: List[Dict[str, str]], tool: str = "Chat"):
+    """Stream response tokens from OpenRouter LLM (Gemma 3n) as they arrive"""
+    api_key = current_api_key()
+    if not api_key:
+        yield "Error: Please enter your OpenRouter API key in the sidebar."
+        return
+    yield from service.stream(api_key, st.session_state.session_id, messages, tool)
+
+def generate_quiz(messages: List[Dict[str, str]], quiz_types, topic: str) -> str:
+    """Ask for every assessment type at once and assemble the replies in order"""
+    api_key = current_api_key()
+    if not api_key:
+        return "Error: Please enter your OpenRouter API key in the sidebar."
+    return service.quiz(api_key, st.session_state.session_id, messages, quiz_types, topic)
+
 def add_message(role: str, content: str):
     """Add message to chat history"""
-    st.session_state.messages.append({
-        "role": role,
-        "content": content,
-        "timestamp": datetime.now().strftime("%H:%M:%S")
-    })
+    service.add_message(st.session_state.session_id, st.session_state.messages, role, content)
 
 def clear_chat():
     """Clear chat history"""
     st.session_state.messages = []
+    service.clear(st.session_state.session_id)
+    st.session_state.pop("visible_messages", None)
+
+def answer_concept_navigation(label: str) -> bool:
+    """Answer concept navigation from the session's concept timeline, without a model call"""
+    reply = service.navigate(st.session_state.session_id, st.session_state.messages, label)
+    if reply is None:
+        return False
+    add_message("user", label)
+    add_message("assistant", reply)
+    return True
 
 # Add this function at the top of your file
 def get_img_tag(image_path, width=16):
     """Convert an image file to a data URL for embedding in HTML"""
-    try:
-        with open(image_path, "rb") as img_file:
-            img_data = base64.b64encode(img_file.read()).decode()
-            return f'<img src="data:image/png;base64,{img_data}" width="{width}" style="vertical-align:middle;margin-right:8px">'
-    except Exception as e:
-        # Return empty string if file not found
-        print(f"Icon not found: {e}")
-        return ""
+    # Served from the process-wide registry; no file I/O on reruns
+    img_tag = get_icons().img_tag(image_path, width)
+    if not img_tag:
+        print(f"Icon not found: {image_path}")
+    return img_tag
 
 # Sidebar with instruction buttons and settings
 with st.sidebar:
@@ -113,9 +132,12 @@ with st.sidebar:
 
         for i, (short_label, instruction) in enumerate(nav_labels):
             if st.button(short_label, key=f"nav_btn_{i}", help=f"Navigation: {short_label}", use_container_width=True):
+                if answer_concept_navigation(short_label):
+                    st.rerun()
                 if "current_input" not in st.session_state:
                     st.session_state.current_input = ""
                 st.session_state.current_input = instruction + " "
+                st.session_state.pending_tool = short_label.strip()
                 st.rerun()
     
     # Teaching Methods Section - Collapsible
@@ -138,6 +160,7 @@ with st.sidebar:
                 if "current_input" not in st.session_state:
                     st.session_state.current_input = ""
                 st.session_state.current_input = instruction + " "
+                st.session_state.pending_tool = short_label.strip()
                 st.rerun()
     
     # Assessment Strategies Section - Collapsible
@@ -159,331 +182,16 @@ with st.sidebar:
                 if "current_input" not in st.session_state:
                     st.session_state.current_input = ""
                 st.session_state.current_input = instruction + " "
+                st.session_state.pending_tool = short_label.strip()
                 st.rerun()
+
+        if st.button("Generate Full Quiz", key="full_quiz_btn", help="Generate every assessment type at once", use_container_width=True):
+            st.session_state.quiz_requested = True
     
     st.divider()
 
-# Add custom CSS for Google Gemini-inspired styling
-st.markdown("""
-<style>
-/* Global app styling */
-.stApp {
-    background: linear-gradient(135deg, #f0f4ff 0%, #fafbff 100%) !important;
-}
-
-.main .block-container {
-    max-width: none !important;
-    padding-left: 2rem !important;
-    padding-right: 2rem !important;
-}
-
-/* Main content area styling */
-
-/* Chat container styling - Gemini-inspired */
-.chat-container {
-    max-width: 1000px !important;
-    margin: 0 auto !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f8faff 100%) !important;
-    border-radius: 24px !important;
-    padding: 24px !important;
-    box-shadow: 0 8px 24px rgba(0, 0, 0, 0.06) !important;
-    border: 1px solid #e8eaed !important;
-}
-
-/* Chat messages styling - Gemini-inspired */
-.stChatMessage {
-    border-radius: 18px !important;
-    margin: 12px 0 !important;
-    max-width: 90% !important;
-    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.05) !important;
-    font-size: 14px !important;
-    line-height: 1.5 !important;
-}
-
-/* User message styling - Gemini blue */
-.stChatMessage[data-testid="chat-message-user"] {
-    background: linear-gradient(135deg, #4285f4 0%, #1a73e8 100%) !important;
-    color: white !important;
-    margin-left: auto !important;
-    margin-right: 0 !important;
-}
-
-/* Assistant message styling - Gemini light */
-.stChatMessage[data-testid="chat-message-assistant"] {
-    background: linear-gradient(135deg, #f8faff 0%, #ffffff 100%) !important;
-    border: 1px solid #e8eaed !important;
-    color: #3c4043 !important;
-    margin-left: 0 !important;
-    margin-right: auto !important;
-}
-
-/* Form styling - Gemini-inspired with full width */
-.stForm {
-    max-width: none !important;
-    width: 100% !important;
-    margin: 20px 0 !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f8faff 100%) !important;
-    border-radius: 20px !important;
-    padding: 20px !important;
-    box-shadow: 0 4px 16px rgba(0, 0, 0, 0.08) !important;
-    border: 1px solid #e8eaed !important;
-}
-
-/* Text area styling - Gemini-inspired */
-.stTextArea textarea {
-    border-radius: 16px !important;
-    border: 2px solid #e8eaed !important;
-    padding: 16px !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f8faff 100%) !important;
-    color: #3c4043 !important;
-    font-size: 14px !important;
-    transition: all 0.2s ease !important;
-    width: 100% !important;
-}
-
-.stTextArea textarea:focus {
-    border-color: #4285f4 !important;
-    box-shadow: 0 0 0 3px rgba(66, 133, 244, 0.1) !important;
-    background: #ffffff !important;
-    outline: none !important;
-}
-
-/* Send button styling - Gemini blue */
-.stFormSubmitButton button {
-    border-radius: 12px !important;
-    padding: 8px 16px !important;
-    font-weight: 500 !important;
-    background: linear-gradient(135deg, #4285f4 0%, #1a73e8 100%) !important;
-    color: white !important;
-    border: none !important;
-    font-size: 13px !important;
-    transition: all 0.2s ease !important;
-    box-shadow: 0 2px 6px rgba(66, 133, 244, 0.2) !important;
-    height: 36px !important;
-    min-height: 36px !important;
-}
-
-.stFormSubmitButton button:hover {
-    transform: translateY(-1px) !important;
-    box-shadow: 0 4px 12px rgba(66, 133, 244, 0.3) !important;
-    background: linear-gradient(135deg, #1a73e8 0%, #1557b0 100%) !important;
-}
-
-/* Dropdown styling for attachment */
-.stSelectbox {
-    margin: 0 !important;
-    width: 100% !important;
-}
-
-.stSelectbox > div > div {
-    border-radius: 8px !important;
-    border: 1px solid #e8eaed !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f8faff 100%) !important;
-    min-height: 32px !important;
-    font-size: 12px !important;
-}
-
-.stSelectbox > div > div:hover {
-    border-color: #4285f4 !important;
-}
-
-.stSelectbox label {
-    font-size: 14px !important;
-    font-weight: 500 !important;
-    color: #4285f4 !important;
-}
-
-/* File uploader styling - only when shown */
-.stFileUploader {
-    margin: 8px 0 !important;
-    width: 100% !important;
-}
-
-.stFileUploader > div {
-    background: linear-gradient(135deg, #f8faff 0%, #ffffff 100%) !important;
-    border: 2px dashed #e8eaed !important;
-    border-radius: 12px !important;
-    padding: 16px !important;
-    text-align: center !important;
-    transition: all 0.2s ease !important;
-    width: 100% !important;
-    box-sizing: border-box !important;
-}
-
-.stFileUploader > div:hover {
-    border-color: #4285f4 !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f1f5ff 100%) !important;
-}
-
-.stFileUploader label {
-    color: #3c4043 !important;
-    font-weight: 500 !important;
-    font-size: 14px !important;
-}
-
-/* Section headers - Gemini styling */
-h3 {
-    color: #3c4043 !important;
-    font-weight: 600 !important;
-    font-size: 20px !important;
-    margin-bottom: 16px !important;
-    text-align: center !important;
-}
-
-/* Sidebar styling - Gemini-inspired with better button support */
-.css-1d391kg {
-    background: linear-gradient(135deg, #f8faff 0%, #ffffff 100%) !important;
-    border-right: 1px solid #e8eaed !important;
-    width: 350px !important;  /* Wide sidebar for buttons */
-    min-width: 350px !important;
-}
-
-/* Hide sidebar collapse button to make it fixed - multiple selectors */
-button[kind="header"] {
-    display: none !important;
-}
-
-/* Hide the sidebar toggle button with various selectors */
-.css-1rs6os {
-    display: none !important;
-}
-
-button[data-testid="collapsedControl"] {
-    display: none !important;
-}
-
-button[data-testid="baseButton-header"] {
-    display: none !important;
-}
-
-.css-1544g2n {
-    display: none !important;
-}
-
-.css-1cypcdb {
-    display: none !important;
-}
-
-/* Hide any button that contains chevron or arrow icons */
-button svg[data-testid*="chevron"] {
-    display: none !important;
-}
-
-button svg[data-testid*="arrow"] {
-    display: none !important;
-}
-
-/* Hide the entire header area where collapse button sits */
-.css-1avcm0n {
-    display: none !important;
-}
-
-/* Ensure sidebar stays fixed */
-.css-1d391kg {
-    position: fixed !important;
-    height: 100vh !important;
-    overflow-y: auto !important;
-}
-
-/* Sidebar buttons - full width and properly styled */
-.css-1d391kg .stButton > button {
-    width: 100% !important;
-    min-width: 100% !important;
-    max-width: 100% !important;
-    height: 40px !important;
-    min-height: 40px !important;
-    max-height: 40px !important;
-    border-radius: 8px !important;
-    font-size: 12px !important;
-    line-height: 1.2 !important;
-    white-space: nowrap !important;
-    padding: 8px 12px !important;
-    display: flex !important;
-    align-items: center !important;
-    justify-content: flex-start !important;
-    text-align: left !important;
-    overflow: hidden !important;
-    text-overflow: ellipsis !important;
-    box-sizing: border-box !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f8faff 100%) !important;
-    border: 1px solid #e8eaed !important;
-    color: #3c4043 !important;
-    font-weight: 500 !important;
-    transition: all 0.2s ease !important;
-    box-shadow: 0 1px 3px rgba(60, 64, 67, 0.06) !important;
-    margin-bottom: 4px !important;
-}
-
-.css-1d391kg .stButton > button:hover {
-    transform: translateY(-1px) !important;
-    box-shadow: 0 4px 12px rgba(66, 133, 244, 0.15) !important;
-    border-color: #4285f4 !important;
-    background: linear-gradient(135deg, #ffffff 0%, #f1f5ff 100%) !important;
-}
-
-/* Icon styling for all sidebar buttons */
-
-/* Navigation Icons - Add the history icon directly here */
-button[key="nav_btn_2"] {
-    background-image: url('data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTYiIGhlaWdodD0iMTYiIHZpZXdCb3g9IjAgMCAyNCAyNCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHBhdGggZD0iTTEyIDJDNi40NzcgMiAyIDYuNDc3IDIgMTJTNi40NzcgMjIgMTIgMjIgMjIgMTcuNTIzIDIyIDEyIDE3LjUyMyAyIDEyIDJaTTEyIDIwQzcuNTg5IDIwIDQgMTYuNDExIDQgMTJTNy41ODkgNCA0IDEyIDEyIDIwIDEyIDIwWk0xMSA3SDEzVjEyLjQxNEwxNS4yOTMgMTQuNzA3TDE0LjU4NiAxNS40MTRMMTJGMTNEMDY3WiIgZmlsbD0iIzMzMzMzMyIvPgo8L3N2Zz4K') !important;
-    background-size: 16px 16px !important;
-    background-repeat: no-repeat !important;
-    background-position: 8px center !important;
-    padding-left: 32px !important;
-}
-</style>
-
-<script>
-// JavaScript to hide sidebar collapse button after page loads
-document.addEventListener('DOMContentLoaded', function() {
-    function hideSidebarToggle() {
-        // Try multiple selectors to find and hide the toggle button
-        const selectors = [
-            'button[kind="header"]',
-            'button[data-testid="collapsedControl"]',
-            'button[data-testid="baseButton-header"]',
-            '.css-1rs6os',
-            '.css-1544g2n',
-            '.css-1cypcdb',
-            '.css-1avcm0n',
-            'button[aria-label*="collapse"]',
-            'button[aria-label*="expand"]'
-        ];
-        
-        selectors.forEach(selector => {
-            const elements = document.querySelectorAll(selector);
-            elements.forEach(el => {
-                el.style.display = 'none';
-                el.style.visibility = 'hidden';
-            });
-        });
-        
-        // Also hide any buttons with chevron/arrow icons in sidebar area
-        const allButtons = document.querySelectorAll('button');
-        allButtons.forEach(button => {
-            const svg = button.querySelector('svg');
-            if (svg && (svg.innerHTML.includes('chevron') || svg.innerHTML.includes('arrow'))) {
-                // Check if this looks like a sidebar toggle
-                const rect = button.getBoundingClientRect();
-                if (rect.left < 100) { // Likely in sidebar area
-                    button.style.display = 'none';
-                }
-            }
-        });
-    }
-    
-    // Run immediately and also with delays to catch dynamically loaded content
-    hideSidebarToggle();
-    setTimeout(hideSidebarToggle, 100);
-    setTimeout(hideSidebarToggle, 500);
-    setTimeout(hideSidebarToggle, 1000);
-    
-    // Set up observer to catch future DOM changes
-    const observer = new MutationObserver(hideSidebarToggle);
-    observer.observe(document.body, { childList: true, subtree: true });
-});
-</script>
-""", unsafe_allow_html=True)
+# Google Gemini-inspired styling from static/, sent to each browser page once
+st.session_state.theme_payload_bytes = inject_theme(["gemini.css"], __file__)
 
 # Welcome message above chat
 st.markdown("<h1 style='text-align: center; color: #4285f4; font-weight: 600; font-size: 28px; margin: 32px 0 24px 0;'>Welcome to Gemma 3n Learner</h1>", unsafe_allow_html=True)
@@ -491,12 +199,10 @@ st.markdown("<h1 style='text-align: center; color: #4285f4; font-weight: 600; fo
 # Chat container - using streamlit's native width
 chat_container = st.container()
 
-# Display chat messages
+# Display chat messages, newest page only; older turns load on request
 with chat_container:
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
-            st.caption(f"🕒 {message['timestamp']}")
+    with span("render"):
+        st.session_state.transcript_stats = render_transcript(st.session_state.messages)
 
 # Chat input
 if "current_input" not in st.session_state:
@@ -518,6 +224,20 @@ with st.form("chat_form", clear_on_submit=True):
     with col4:
         clear_input = st.form_submit_button("Clear")
 
+def ingest_progress(job, polling: bool):
+    """Progress of the attached syllabus, indexed on a background worker"""
+    if polling and job.finished:
+        # run_every is fixed when the fragment is created; a full rerun
+        # recreates it without polling
+        st.rerun()
+    if job.error:
+        st.error(job.error)
+    elif job.finished:
+        st.caption(f"📚 Syllabus indexed: {job.chunk_count} chunks in {job.seconds:.1f}s")
+    else:
+        st.progress(job.progress, text=f"📚 Indexing syllabus in the background: "
+                                       f"{job.progress:.0%}, {job.chunk_count} chunks ready")
+
 # File attachment section - right below the chat form (no separator)
 with st.expander("📎 Attach Syllabus ", expanded=False):
     uploaded_file_expanded = st.file_uploader(
@@ -538,67 +258,74 @@ with st.expander("📎 Attach Syllabus ", expanded=False):
         st.write(f"• **Size:** {uploaded_file_expanded.size} bytes")
         st.write(f"• **Type:** {uploaded_file_expanded.type}")
 
-def extract_text_from_file(uploaded_file):
-    """Extract text from uploaded file (.txt, .pdf, .docx)"""
-    try:
-        if uploaded_file.type == "text/plain":
-            return str(uploaded_file.read(), "utf-8")
-        elif uploaded_file.type == "application/pdf":
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text if text else "No extractable text found in PDF."
-        elif uploaded_file.type in [
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "application/msword"
-        ] or uploaded_file.name.lower().endswith(".docx"):
-            doc = docx.Document(io.BytesIO(uploaded_file.read()))
-            return "\n".join([para.text for para in doc.paragraphs])
-        else:
-            return f"File type {uploaded_file.type} is not supported. Please upload a .txt, .pdf, or .docx file."
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
+        # Chat carries on while the file is read; excerpts come from the pages indexed
+        # so far, and only this fragment reruns to follow the progress
+        ingest_job = service.ingest(uploaded_file_expanded)
+        polling = not ingest_job.finished
+        st.fragment(run_every=1.0 if polling else None)(ingest_progress)(ingest_job, polling)
 
 if submit_button and user_input.strip():
+    # Tokens are booked to the sidebar tool that pre-filled the message, if any
+    tool = st.session_state.pop("pending_tool", "Chat")
     # Add user message (include file content if uploaded)
     message_content = user_input
     if uploaded_file_expanded:
-        file_text = extract_text_from_file(uploaded_file_expanded)
-        # Truncate file_text if too long (to avoid LLM token limits)
-        max_file_chars = 3000
-        if len(file_text) > max_file_chars:
-            file_text = file_text[:max_file_chars] + "\n...[truncated]..."
-        message_content += f"\n\n📎 **Attached file content:**\n{file_text}"
+        # Only a reference goes into the chat; relevant chunks are retrieved per turn
+        message_content += f"\n\n📎 **Attached file:** {uploaded_file_expanded.name}"
     add_message("user", message_content)
     st.session_state.current_input = ""
 
-    # Prepare messages for LLM, hiding the tutor instruction from user chat
-    tutor_instruction = "You are a helpful tutor. You are to keep track of the 'Concept' we cover from the syllabus. End Each message with" \
-    "'Current Concept:[whatever 'Concept' we are currently on in the syllabus] and with every  New syllabus always ask where would you like that start your learning?"
-    messages_for_llm = []
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            # Prepend the instruction to every user message sent to the model
-            messages_for_llm.append({
-                "role": "user",
-                "content": tutor_instruction + "\n\n" + msg["content"]
-            })
-        else:
-            messages_for_llm.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-
-    with st.spinner("🤔 Analyzing..."):
-        response = get_llm_response(messages_for_llm)
+    # Older turns are folded into the rolling summary, syllabus excerpts added
+    # and the tutor instruction sent once as a system message
+    messages_for_llm = service.build_request(
+        current_api_key(),
+        st.session_state.session_id,
+        st.session_state.messages,
+        upload=uploaded_file_expanded,
+        question=user_input,
+        cache_prefix=st.session_state.get("prompt_caching", PROMPT_CACHING),
+        measure=lambda savings: st.session_state.update(prompt_savings=savings)
+    )
+
+    if st.session_state.get("stream_responses", True):
+        # Show the new turn right away and fill the assistant bubble token by token
+        with chat_container:
+            with st.chat_message("user"):
+                st.write(message_content)
+                st.caption(f"🕒 {st.session_state.messages[-1]['timestamp']}")
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                parts = []
+                for token in stream_llm_response(messages_for_llm, tool):
+                    parts.append(token)
+                    placeholder.markdown("".join(parts) + "▌")
+                response = "".join(parts)
+                placeholder.markdown(response)
+    else:
+        with st.spinner("🤔 Analyzing..."):
+            response = get_llm_response(messages_for_llm, tool)
     add_message("assistant", response)
     st.rerun()
 
+if st.session_state.pop("quiz_requested", False):
+    topic = current_concept(st.session_state.messages) or "the current topic"
+    # Shared context for every quiz section, built before the quiz request is logged
+    quiz_messages = service.build_request(
+        current_api_key(),
+        st.session_state.session_id,
+        st.session_state.messages,
+        cache_prefix=st.session_state.get("prompt_caching", PROMPT_CACHING)
+    )
+    add_message("user", f"📝 Generate a full quiz on {topic}")
+    quiz_types = [(label.strip(), instruction) for label, instruction, *_ in assessment_labels if label != "Tutor Mode"]
+    with st.spinner("📝 Generating quiz..."):
+        quiz = generate_quiz(quiz_messages, quiz_types, topic)
+    add_message("assistant", quiz)
+    st.rerun()
+
 if clear_input:
     st.session_state.current_input = ""
+    st.session_state.pop("pending_tool", None)
     st.rerun()
 
 # Footer
@@ -629,6 +356,94 @@ with st.expander("Configuration", expanded=False):
         st.session_state.openrouter_api_key = openrouter_api_key
         st.success("API key updated successfully!")
 
+    st.checkbox(
+        "Stream responses",
+        value=True,
+        help="Show the tutor's reply token by token as it is generated",
+        key="stream_responses"
+    )
+    st.checkbox(
+        "Prompt caching",
+        value=PROMPT_CACHING,
+        help="Mark the tutor instruction as a cacheable prefix for providers that support prompt caching "
+             "(not available for models whose system messages are folded into the first user turn)",
+        key="prompt_caching",
+        disabled=not supports_system_role(service.router.model)
+    )
+    if "prompt_savings" in st.session_state:
+        savings = st.session_state.prompt_savings
+        st.caption(
+            f"✂️ Last request: {savings['bytes_saved']} bytes / ~{savings['tokens_saved']} tokens "
+            f"saved by sending the tutor instruction once"
+        )
+
+    timeline = service.concepts(st.session_state.session_id, st.session_state.messages)
+    if timeline.transitions:
+        st.caption(f"🧭 Concept timeline: {len(timeline.order)} concepts, {len(timeline.transitions)} transitions")
+        st.json(timeline.to_dicts(), expanded=False)
+    st.caption(f"🎨 Theme payload this rerun: {st.session_state.theme_payload_bytes} bytes")
+    transcript = st.session_state.transcript_stats
+    st.caption(
+        f"🖼️ Transcript render: {transcript['ms']:.1f} ms for "
+        f"{transcript['rendered']} of {transcript['total']} messages"
+    )
+
+    shared = service.stats()
+    stats = shared["connections"]
+    st.caption(
+        f"🔌 Connections: {stats['requests']} requests, "
+        f"{stats['connections_opened']} opened, {stats['connections_reused']} reused"
+    )
+    cache = shared["syllabus_cache"]
+    st.caption(
+        f"📄 Syllabus cache: {cache['entries']} files ({cache['bytes'] // 1024} KB), "
+        f"{cache['hits']} hits, {cache['misses']} misses"
+    )
+    ingestion = shared["ingestion"]
+    if ingestion["jobs"]:
+        st.caption(
+            f"📚 Syllabus ingestion: {ingestion['running']} running, "
+            f"{ingestion['queued']} queued, {ingestion['done']} done, {ingestion['failed']} failed"
+        )
+    routing = shared["routing"]
+    for backend in routing["backends"]:
+        latency = "—" if backend["ewma_latency_ms"] is None else f"{backend['ewma_latency_ms']:.0f} ms"
+        st.caption(
+            f"{'🟢' if backend['healthy'] else '🔴'} {backend['name']} ({backend['model']}): "
+            f"{latency}, error rate {backend['ewma_error_rate']:.0%}, {backend['requests']} requests"
+        )
+    if routing["hedged"]:
+        st.caption(f"🏁 Hedged requests: {routing['hedged']} ({routing['hedge_wins']} won by the hedge)")
+    usage = service.ledger.session_stats(st.session_state.session_id)
+    if usage["totals"]["turns"]:
+        totals = usage["totals"]
+        budget = f" of {SESSION_TOKEN_BUDGET:,}" if SESSION_TOKEN_BUDGET else ""
+        st.caption(
+            f"🧮 Tokens this session: {totals['total_tokens']:,}{budget} "
+            f"({totals['prompt_tokens']:,} prompt, {totals['completion_tokens']:,} completion) "
+            f"over {totals['turns']} requests"
+        )
+        st.json(usage["tools"], expanded=False)
+    flights = shared["coalescing"]
+    if flights["collapsed"]:
+        st.caption(
+            f"🤝 Coalesced requests: {flights['collapsed']} of {flights['requests']} "
+            f"shared an identical call already in flight"
+        )
+    cached = shared["response_cache"]
+    if cached is not None:
+        st.caption(
+            f"♻️ Response cache: {cached['entries']} replies, "
+            f"{cached['hits']} hits, {cached['misses']} misses"
+        )
+
+if METRICS_PANEL:
+    with st.expander("Performance", expanded=False):
+        st.caption("Time per stage of a chat turn in this server process, recent samples (ms)")
+        st.dataframe(stage_stats(), hide_index=True, use_container_width=True)
+        st.download_button("Download Prometheus metrics", prometheus_text(),
+                           file_name="learner_metrics.prom", mime="text/plain")
+
 st.markdown(
     """
     <div style='text-align: center; color: #666;'>
@@ -0,0 +1,72 @@
+"""Per-rerun cost of sidebar icons: direct file access vs. the icon registry.
+
+Replays what one Streamlit rerun of ``app.py`` does for icons (an
+``os.path.exists`` per sidebar tool plus reading and base64-encoding the
+logo) and compares it with lookups in the in-memory registry.
+
+    python benchmarks/bench_icons.py [--reruns 2000]
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from learner.assets import ICON_DIR, IconRegistry  # noqa: E402
+
+LOGO = "gemma3.png"
+
+
+def rerun_from_disk(paths):
+    """Icon work of one rerun before the registry"""
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as icon_file:
+                icon_file.read()  # st.image(path) reads the file
+    with open(os.path.join(ICON_DIR, LOGO), "rb") as img_file:
+        base64.b64encode(img_file.read()).decode()
+
+
+def rerun_from_registry(registry, paths):
+    """Icon work of one rerun with the registry"""
+    for path in paths:
+        registry.get(path)
+    registry.img_tag(LOGO, width=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=2000)
+    args = parser.parse_args()
+
+    paths = [os.path.join(ICON_DIR, name) for name in sorted(os.listdir(ICON_DIR)) if name != LOGO]
+
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        rerun_from_disk(paths)
+    disk = (time.perf_counter() - start) / args.reruns
+
+    start = time.perf_counter()
+    registry = IconRegistry()
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        rerun_from_registry(registry, paths)
+    cached = (time.perf_counter() - start) / args.reruns
+
+    print(json.dumps({
+        "icons": len(paths) + 1,
+        "reruns": args.reruns,
+        "disk_us_per_rerun": round(disk * 1e6, 2),
+        "registry_us_per_rerun": round(cached * 1e6, 2),
+        "registry_load_ms_once": round(load * 1e3, 3),
+        "speedup": round(disk / cached, 1) if cached else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Chat responsiveness while a large syllabus is ingested in the background.
+
+Builds a text PDF of ``--pages`` pages and measures:
+
+- what inline extraction cost the first Send before ingestion moved to the
+  background (``inline_extract_s``);
+- chat turn latency (prompt assembly with syllabus excerpts plus an
+  in-process stub LLM call) with no ingestion running, and again while the
+  PDF is read by the ingestion queue;
+- how soon the first chunks are searchable and how long the whole file takes.
+
+    python benchmarks/bench_ingest.py [--pages 500] [--latency 0.05] [--processes 0]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ("photosynthesis chlorophyll light reactions calvin cycle carbon fixation stomata "
+         "glucose respiration mitochondria enzyme membrane diffusion osmosis").split()
+
+
+def build_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A minimal text PDF, one Helvetica content stream per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [f"Chapter {page // 20 + 1}, page {page + 1}: "
+                 + " ".join(WORDS[(page + line + i) % len(WORDS)] for i in range(10))
+                 for line in range(lines_per_page)]
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)], 1)
+
+    return {"p50": at(50), "p95": at(95), "p99": at(99), "max": round(ordered[-1], 1), "turns": len(ordered)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per reply")
+    parser.add_argument("--idle-turns", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=0, help="LEARNER_PDF_PROCESSES for the ingestion job")
+    args = parser.parse_args()
+
+    # Read when learner is first imported
+    os.environ["LEARNER_RATE_LIMIT_RPM"] = "0"
+    os.environ["LEARNER_SESSION_STORE"] = ""
+    os.environ["LEARNER_PDF_PROCESSES"] = str(args.processes)
+    from learner import Router, TutorService, Upload, set_router
+    from learner.extraction import extract_text
+    from learner.stub_llm import StubBackend, StubLLM
+
+    set_router(Router([StubBackend(llm=StubLLM(args.latency, 0.0, 0, 40, seed=0))]))
+    service = TutorService()
+    pdf = build_pdf(args.pages)
+
+    start = time.perf_counter()
+    extract_text(pdf, "application/pdf")
+    inline_s = time.perf_counter() - start
+
+    def turn(session_id: str, upload, question: str) -> float:
+        start = time.perf_counter()
+        messages = [{"role": "user", "content": question}]
+        request = service.build_request("stub-key", session_id, messages, upload=upload, question=question)
+        service.complete("stub-key", session_id, request)
+        return (time.perf_counter() - start) * 1000
+
+    small = Upload(b"Week 1: photosynthesis and chlorophyll\nWeek 2: the Calvin cycle\n", "text/plain", "notes.txt")
+    idle = [turn("idle", small, f"Explain {WORDS[i % len(WORDS)]}") for i in range(args.idle_turns)]
+
+    # A distinct file each run, so nothing is served from the caches
+    book = Upload(pdf, "application/pdf", "textbook.pdf")
+    progress = []
+    start = time.perf_counter()
+    job = service.ingest(book)
+
+    def watch():
+        while not job.finished:
+            progress.append((time.perf_counter() - start, job.chunk_count))
+            time.sleep(0.05)
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    busy, excerpts = [], 0
+    while not job.finished:
+        busy.append(turn("busy", book, f"Explain {WORDS[len(busy) % len(WORDS)]}"))
+        excerpts += job.chunk_count > 0
+    ingest_s = time.perf_counter() - start
+    watcher.join()
+    first_chunks_s = next((t for t, chunks in progress if chunks), ingest_s)
+
+    print(json.dumps({
+        "pages": args.pages,
+        "pdf_bytes": len(pdf),
+        "pdf_processes": args.processes,
+        "stub_latency_s": args.latency,
+        "inline_extract_s": round(inline_s, 2),
+        "ingest_s": round(ingest_s, 2),
+        "first_chunks_s": round(first_chunks_s, 2),
+        "chunks": job.chunk_count,
+        "status": job.status,
+        "turn_ms_idle": percentiles(idle),
+        "turn_ms_during_ingest": percentiles(busy),
+        "turns_with_excerpts": excerpts,
+        "ingestion": service.ingest_queue.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""End-to-end load test: concurrent simulated students in one app process.
+
+Each simulated student is a Streamlit ``AppTest`` session driving the real
+script against the local stub LLM (``learner.stub_llm``): it enters an API
+key, attaches a syllabus, then alternates typed chat turns with sidebar tool
+buttons.  Sessions run concurrently on threads, as Streamlit runs each
+browser session's reruns, and share the process-wide pools and caches.
+
+For each concurrency level it reports per-turn latency percentiles, the cost
+of a plain rerun once the transcript has grown, errors and CPU use, and the
+instrumented stages of a turn (``learner.metrics``) over the whole run.  The
+largest level whose p95 turn latency stays under ``--slo-ms`` is the
+maximum sustainable session count.  A separate pass under ``tracemalloc``
+measures Python memory retained per session.
+
+    python benchmarks/bench_load.py [--app app.py] [--sessions 1,2,4,8,16] [--turns 6]
+                                    [--latency 0.3] [--tokens-per-second 50] [--slo-ms 3000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_store_dir = tempfile.TemporaryDirectory()
+# Read when learner is first imported: the stub must not be throttled, and
+# sessions persist to a throwaway store
+os.environ["LEARNER_RATE_LIMIT_RPM"] = "0"
+os.environ["LEARNER_SESSION_STORE"] = "sqlite:" + os.path.join(_store_dir.name, "sessions.db")
+
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner  # noqa: E402
+
+from learner import Backend, Router, get_single_flight, set_router, stage_stats  # noqa: E402
+from learner.stub_llm import StubLLM, start_stub_server  # noqa: E402
+
+CHAT_TURNS = [
+    "Teach me how photosynthesis works",
+    "What happens in the light-dependent reactions?",
+    "How does the Calvin cycle use ATP?",
+    "Why do plants need chlorophyll?",
+    "Compare photosynthesis with cellular respiration",
+]
+# Sidebar tools: (button key, topic typed after the pre-filled instruction)
+TOOL_TURNS = [
+    ("learn_btn_0", "photosynthesis"),
+    ("learn_btn_7", "the Calvin cycle"),
+    ("assess_btn_0", "chloroplasts"),
+    ("learn_btn_9", "light reactions"),
+]
+
+
+def _share_test_runtime():
+    """Let AppTest sessions run on several threads at once, as in one server
+
+    Each ``AppTest.run`` installs a mock runtime as the singleton and clears it
+    when done, which would pull it from under runs still going on other
+    threads; those fall back to the most recent mock instead.  Runs also share
+    one script cache, so the script is compiled once as by a real server
+    (concurrent compiles of the same file are not thread-safe on 3.11).
+    """
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    lookup = Runtime.instance.__func__
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        elif last:
+            return last[0]
+        return lookup(cls)
+
+    Runtime.instance = classmethod(instance)
+
+
+def syllabus(weeks: int = 40) -> bytes:
+    lines = []
+    for week in range(1, weeks + 1):
+        lines.append(f"Week {week}: Plant biology unit {week}")
+        lines.extend(
+            f"Objective {week}.{item}: explain stage {item} of photosynthesis, the role of "
+            f"chlorophyll, ATP and NADPH, and how the Calvin cycle fixes carbon dioxide."
+            for item in range(1, 8)
+        )
+    return "\n".join(lines).encode("utf-8")
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)], 1)
+
+    return {"p50": at(50), "p95": at(95), "p99": at(99), "max": round(ordered[-1], 1)}
+
+
+def timed_run(at: AppTest) -> float:
+    start = time.perf_counter()
+    at.run()
+    return (time.perf_counter() - start) * 1000
+
+
+def simulate_student(app_path: str, turns: int, attach: bytes, timeout: float, student: int = 0):
+    """One student's session; returns its measurements and the live AppTest
+
+    Typed questions differ between students; tool buttons on the same topic
+    are what a class tends to press together.
+    """
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    first_render = timed_run(at)
+    at.text_input(key="openrouter_api_key_input").input("stub-key")
+    at.run()
+    if attach:
+        at.file_uploader[0].upload("syllabus.txt", attach, "text/plain")
+        at.run()
+    turn_ms, errors = [], 0
+    for turn in range(turns):
+        if turn % 2:
+            key, topic = TOOL_TURNS[(turn // 2) % len(TOOL_TURNS)]
+            # The button pre-fills the message box with the tool's instruction
+            at.button(key=key).click().run()
+            at.text_area[0].input(at.text_area[0].value + topic)
+        else:
+            question = CHAT_TURNS[(turn // 2 + student) % len(CHAT_TURNS)]
+            at.text_area[0].input(f"{question} (student {student})")
+        next(button for button in at.button if button.label == "Send").click()
+        turn_ms.append(timed_run(at))
+        messages = at.session_state["messages"]
+        if at.exception or not messages or messages[-1]["content"].startswith("Error"):
+            errors += 1
+    rerun_ms = timed_run(at)
+    return {"first_render_ms": first_render, "turn_ms": turn_ms, "rerun_ms": rerun_ms, "errors": errors}, at
+
+
+def cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+def run_level(app_path: str, sessions: int, turns: int, attach: bytes, timeout: float):
+    gc.collect()
+    cpu, wall = cpu_seconds(), time.perf_counter()
+    with ThreadPoolExecutor(sessions) as pool:
+        futures = [pool.submit(simulate_student, app_path, turns, attach, timeout, student)
+                   for student in range(sessions)]
+        results = [future.result()[0] for future in futures]
+    wall = time.perf_counter() - wall
+    cpu = cpu_seconds() - cpu
+    return {
+        "sessions": sessions,
+        "turns": sessions * turns,
+        "turn_ms": percentiles([ms for r in results for ms in r["turn_ms"]]),
+        "rerun_ms": percentiles([r["rerun_ms"] for r in results]),
+        "first_render_ms": percentiles([r["first_render_ms"] for r in results]),
+        "errors": sum(r["errors"] for r in results),
+        "wall_s": round(wall, 2),
+        "turns_per_s": round(sessions * turns / wall, 2),
+        "cpu_cores_used": round(cpu / wall, 2),
+    }
+
+
+def memory_per_session(app_path: str, sessions: int, turns: int, attach: bytes, timeout: float) -> float:
+    """Python heap retained per live session, in KB (includes the test client's element tree)"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    live = [simulate_student(app_path, turns, attach, timeout, student)[1] for student in range(sessions)]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del live
+    return round(retained / sessions / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=6, help="chat turns per session (every other one a tool button)")
+    parser.add_argument("--no-syllabus", action="store_true", help="do not attach a syllabus")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=80)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slo-ms", type=float, default=3000, help="p95 turn latency a level must stay under")
+    parser.add_argument("--memory-sessions", type=int, default=4, help="sessions in the tracemalloc pass (0 skips it)")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    _share_test_runtime()
+    llm = StubLLM(args.latency, 0.1 * args.latency, args.tokens_per_second, args.reply_tokens,
+                  args.error_rate, seed=0)
+    server = start_stub_server(llm)
+    set_router(Router([Backend("stub", server.url, "stub")]))
+    app_path = os.path.join(ROOT, args.app)
+    attach = b"" if args.no_syllabus else syllabus()
+
+    # Warm imports and shared caches, as a long-running server would have them
+    simulate_student(app_path, 1, attach, args.timeout)
+    levels = [run_level(app_path, int(n), args.turns, attach, args.timeout)
+              for n in args.sessions.split(",")]
+    sustainable = [level for level in levels if level["turn_ms"]["p95"] <= args.slo_ms]
+    best = max(sustainable, key=lambda level: level["sessions"]) if sustainable else None
+    memory_kb = (memory_per_session(app_path, args.memory_sessions, args.turns, attach, args.timeout)
+                 if args.memory_sessions else None)
+    server.shutdown()
+
+    print(json.dumps({
+        "app": args.app,
+        "cpu_count": os.cpu_count(),
+        "stub": {"latency_s": args.latency, "tokens_per_second": args.tokens_per_second,
+                 "reply_tokens": args.reply_tokens, "error_rate": args.error_rate},
+        "turns_per_session": args.turns,
+        "syllabus_bytes": len(attach),
+        "slo_p95_ms": args.slo_ms,
+        "levels": levels,
+        "max_sustainable_sessions": best["sessions"] if best else 0,
+        # Script reruns share one interpreter, so CPU rather than core count is the limit
+        "sessions_per_core": (round(best["sessions"] / max(best["cpu_cores_used"], 0.01), 1)
+                              if best else 0),
+        "memory_per_session_kb": memory_kb,
+        "coalesced_requests": get_single_flight().stats()["collapsed"],
+        # Where turn time went, over every level
+        "stages": stage_stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
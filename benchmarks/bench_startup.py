@@ -0,0 +1,89 @@
+"""Cold-start and per-rerun import cost of the app, from ``python -X importtime``.
+
+Cold start: a fresh interpreter imports what ``app.py`` imports at module
+top; the importtime log is parsed into per-module timings.  Per rerun:
+Streamlit re-executes the script in a warm process, so the same import
+statements only hit ``sys.modules``; that cost is timed directly.
+
+    python benchmarks/bench_startup.py [--app app.py] [--top 10]
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Libraries that should only load once a file is attached
+LAZY_MODULES = ["PyPDF2", "docx", "numpy"]
+
+
+def top_level_imports(app_path: str) -> str:
+    """The module-level import statements of an app script"""
+    with open(app_path, encoding="utf-8") as app_file:
+        tree = ast.parse(app_file.read())
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+def importtime(code: str):
+    """Run ``code`` in a fresh interpreter; returns per-module timings in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "top_level": not name.startswith("  "),
+        })
+    return modules, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--reruns", type=int, default=1000)
+    args = parser.parse_args()
+
+    app_path = os.path.join(ROOT, args.app)
+    imports = top_level_imports(app_path)
+    if os.path.dirname(app_path) != ROOT:
+        imports = f"import sys\nsys.path.insert(0, {ROOT!r})\n" + imports
+    probe = f"\nimport sys\nprint(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    modules, stdout = importtime(imports + probe)
+    eager, _ = importtime("import " + ", ".join(LAZY_MODULES))
+
+    # Per-rerun: the same statements against a warm sys.modules
+    sys.path.insert(0, ROOT)
+    code = compile(imports, "<imports>", "exec")
+    exec(code, {})
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        exec(code, {})
+    rerun_us = (time.perf_counter() - start) / args.reruns * 1e6
+
+    print(json.dumps({
+        "app": args.app,
+        "cold_start_ms": round(sum(m["cumulative_us"] for m in modules if m["top_level"]) / 1000, 1),
+        "lazy_modules_loaded_at_startup": [m for m in stdout.strip().split(",") if m],
+        "lazy_modules_cost_ms": round(sum(m["cumulative_us"] for m in eager if m["top_level"]) / 1000, 1),
+        "per_rerun_import_us": round(rerun_us, 1),
+        "slowest_modules": [
+            {"module": m["module"].strip(), "cumulative_ms": round(m["cumulative_us"] / 1000, 1)}
+            for m in sorted(modules, key=lambda m: -m["cumulative_us"])[:args.top]
+        ],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Shared building blocks for the Learn-2-learn Streamlit apps."""
+from .llm_client import (
+    OPENROUTER_URL,
+    DEFAULT_MODEL,
+    configure_client,
+    get_session,
+    connection_stats,
+    iter_sse_content,
+    LLMError,
+    friendly_error,
+    chat_completion,
+    stream_chat_completion,
+    chat_completion_async,
+    batch_completions,
+    run_batch,
+)
+from .context import (
+    estimate_tokens,
+    build_context,
+    summary_due,
+    fold_turns,
+    new_context_state,
+    summary_request,
+)
+from .prompts import (
+    TUTOR_INSTRUCTION,
+    PROMPT_CACHING,
+    supports_system_role,
+    build_messages,
+    measure_savings,
+)
+from .extraction import (
+    UnsupportedFileType,
+    content_key,
+    extract_text,
+    register_parser,
+    extract_text_cached,
+    extraction_cache_stats,
+)
+from .retrieval import (
+    SyllabusIndex,
+    chunk_text,
+    get_index,
+    format_excerpts,
+)
+from .response_cache import (
+    ResponseCache,
+    MemoryBackend,
+    SQLiteBackend,
+    get_response_cache,
+    set_response_cache,
+)
+from .assets import (
+    ICON_SPRITE,
+    IconRegistry,
+    get_icons,
+)
+from .theme import (
+    theme_loader,
+    theme_version,
+    css_version,
+    static_url,
+    inject_theme,
+)
+from .transcript import (
+    TRANSCRIPT_PAGE_SIZE,
+    render_transcript,
+)
+from .session_store import (
+    SQLiteSessionBackend,
+    WriteBehindStore,
+    get_session_store,
+    set_session_store,
+    browser_session_id,
+)
+from .concepts import (
+    ConceptTimeline,
+    parse_concept,
+    split_trailer,
+    current_concept,
+)
+from .router import (
+    Backend,
+    Router,
+    register_backend,
+    get_router,
+    set_router,
+)
+from .ratelimit import (
+    RateLimitExceeded,
+    TokenBucket,
+    limiter_for,
+)
+from .coalesce import (
+    SingleFlight,
+    request_key,
+    get_single_flight,
+)
+from .metrics import (
+    METRICS_PANEL,
+    span,
+    observe,
+    stage_stats,
+    prometheus_text,
+)
+from .usage import (
+    SESSION_TOKEN_BUDGET,
+    TokenBudgetExceeded,
+    TokenLedger,
+    get_ledger,
+)
+from .ingest import (
+    IngestJob,
+    IngestQueue,
+    get_ingest_queue,
+)
+from .service import (
+    SERVICE_CONVERSATIONS,
+    Conversation,
+    TutorService,
+    Upload,
+)
+from .tools import (
+    NAVIGATION_TOOLS,
+    LEARNING_TOOLS,
+    ASSESSMENT_TOOLS,
+    FULL_QUIZ,
+    QUIZ_TYPES,
+    tool_catalogue,
+    tool_instruction,
+)
@@ -0,0 +1,381 @@
+"""Headless HTTP API for the tutor engine.
+
+A plain ASGI application over :class:`learner.service.TutorService`: chat,
+the sidebar tools and syllabus upload, with replies as JSON or streamed as
+server-sent events.  No script reruns and no websocket per session::
+
+    uvicorn learner.api:app --host 0.0.0.0 --port 8080
+
+Requests carry the student's OpenRouter key as ``Authorization: Bearer
+<key>``, every session endpoint included.  A session belongs to the key its
+first request to this process carried; requests for it with another key
+are refused (403).
+A session's history is read from the session store once and then
+kept by the process serving it, together with its rolling summary and
+attached syllabus, so a session must stay on one process.  To scale out,
+run several instances behind a proxy that routes on the session id in the
+path; ``uvicorn --workers`` spreads requests at random and would split a
+session's history between workers.
+
+    GET    /health
+    GET    /tools                         the sidebar tools and their instructions
+    GET    /sessions/{id}/messages
+    DELETE /sessions/{id}
+    POST   /sessions/{id}/chat            {"message": ..., "stream": false}
+    POST   /sessions/{id}/tools/{label}   {"topic": ..., "stream": false}
+    PUT    /sessions/{id}/syllabus?name=  raw file body, with its Content-Type; indexed
+                                          in the background (202 with the job's progress),
+                                          and attached once it has been read
+    GET    /sessions/{id}/syllabus        progress of the last upload, and the file attached
+    GET    /stats                         shared pools and caches
+    GET    /metrics                       stage latencies, Prometheus text format
+
+Streaming is chosen with ``"stream": true`` or ``Accept: text/event-stream``;
+the stream is ``token`` events followed by one ``done`` event.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote
+
+from .concepts import current_concept
+from .metrics import prometheus_text
+from .service import TutorService, Upload
+from .tools import FULL_QUIZ, NAVIGATION_TOOLS, QUIZ_TYPES, tool_catalogue, tool_instruction
+
+# Threads running blocking service calls (model calls, extraction) per worker
+API_THREADS = int(os.environ.get("LEARNER_API_THREADS", "32"))
+# Largest syllabus upload accepted
+API_MAX_UPLOAD_MB = float(os.environ.get("LEARNER_API_MAX_UPLOAD_MB", "50"))
+
+_SESSION_ID = r"(?P<session_id>[A-Za-z0-9_-]{1,64})"
+
+
+class ApiError(Exception):
+    """Answered as ``{"error": message}`` with the given status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, scope: Dict, body: bytes):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = {key: values[0] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        self.body = body
+
+    def json(self) -> Dict:
+        if not self.body:
+            return {}
+        try:
+            payload = json.loads(self.body)
+        except ValueError:
+            raise ApiError(400, "The request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "The request body must be a JSON object.")
+        return payload
+
+    def api_key(self) -> str:
+        scheme, _, key = self.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not key.strip():
+            raise ApiError(401, "Please send your OpenRouter API key as a Bearer token.")
+        return key.strip()
+
+    def wants_stream(self, payload: Dict) -> bool:
+        return bool(payload.get("stream")) or "text/event-stream" in self.headers.get("accept", "")
+
+
+class Response:
+    def __init__(self, body, status: int = 200, content_type: str = "application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body, ensure_ascii=False)
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.status = status
+        self.content_type = content_type
+
+
+class EventStream:
+    """Server-sent events from an async iterator of ``(event, data)`` pairs"""
+
+    def __init__(self, events: AsyncIterator[Tuple[str, Dict]]):
+        self.events = events
+
+
+def _event(event: str, data: Dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class TutorAPI:
+    """The ASGI application; ``learner.api:app`` is one with its own service"""
+
+    def __init__(self, service: Optional[TutorService] = None, threads: int = API_THREADS):
+        self.service = service or TutorService()
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="learner-api")
+        # Session id -> hash of the API key that owns it; outlives the
+        # service's conversation cache and a clear, not a restart
+        self._owners: Dict[str, str] = {}
+        self._owners_lock = threading.Lock()
+        self._routes: List[Tuple[str, "re.Pattern", Callable]] = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("GET", re.compile(r"/tools"), self.tools),
+            ("GET", re.compile(r"/stats"), self.stats),
+            ("GET", re.compile(r"/metrics"), self.metrics),
+            ("GET", re.compile(rf"/sessions/{_SESSION_ID}/messages"), self.messages),
+            ("DELETE", re.compile(rf"/sessions/{_SESSION_ID}"), self.clear),
+            ("POST", re.compile(rf"/sessions/{_SESSION_ID}/chat"), self.chat),
+            ("POST", re.compile(rf"/sessions/{_SESSION_ID}/tools/(?P<label>[^/]+)"), self.tool),
+            ("PUT", re.compile(rf"/sessions/{_SESSION_ID}/syllabus"), self.syllabus),
+            ("GET", re.compile(rf"/sessions/{_SESSION_ID}/syllabus"), self.syllabus_progress),
+        ]
+
+    # ASGI plumbing
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            handler, params = self._route(scope["method"], scope["path"])
+            request = Request(scope, await self._read_body(receive))
+            response = await handler(request, **params)
+        except ApiError as e:
+            response = Response({"error": e.message}, e.status)
+        if isinstance(response, EventStream):
+            await self._send_events(response, send)
+        else:
+            await self._send(response, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _route(self, method: str, path: str):
+        allowed = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path.rstrip("/") or "/")
+            if match:
+                if route_method == method:
+                    return handler, match.groupdict()
+                allowed = True
+        if allowed:
+            raise ApiError(405, f"{method} is not allowed on {path}.")
+        raise ApiError(404, f"No route for {path}.")
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> bytes:
+        limit = int(API_MAX_UPLOAD_MB * 1024 * 1024)
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise ApiError(413, f"Request bodies are limited to {API_MAX_UPLOAD_MB:g} MB.")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _send(response: Response, send: Callable):
+        await send({"type": "http.response.start", "status": response.status, "headers": [
+            (b"content-type", response.content_type.encode()),
+            (b"content-length", str(len(response.body)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": response.body})
+
+    @staticmethod
+    async def _send_events(stream: EventStream, send: Callable):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+        ]})
+        async for event, data in stream.events:
+            await send({"type": "http.response.body", "body": _event(event, data), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking service call off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def _iterate(self, iterator: Iterator[str]) -> AsyncIterator[str]:
+        """Items of a blocking iterator, drained by one worker thread"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for item in iterator:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        # A client that disconnects does not stop the upstream call; other
+        # sessions may share it, and the reply is still recorded
+        pump_done = loop.run_in_executor(self._executor, pump)
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        await pump_done
+
+    def _authorize(self, request: Request, session_id: str) -> str:
+        """The request's API key, if it may use this session"""
+        api_key = request.api_key()
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with self._owners_lock:
+            owner = self._owners.setdefault(session_id, digest)
+        if not hmac.compare_digest(owner, digest):
+            raise ApiError(403, "This session belongs to a different API key.")
+        return api_key
+
+    # Endpoints
+
+    async def health(self, request: Request):
+        return Response({"status": "ok"})
+
+    async def tools(self, request: Request):
+        return Response(tool_catalogue())
+
+    async def stats(self, request: Request):
+        return Response(self.service.stats())
+
+    async def metrics(self, request: Request):
+        return Response(prometheus_text(), content_type="text/plain; version=0.0.4")
+
+    async def messages(self, request: Request, session_id: str):
+        self._authorize(request, session_id)
+        messages = await self._run(self.service.history, session_id)
+        return Response({"session_id": session_id, "messages": list(messages)})
+
+    async def clear(self, request: Request, session_id: str):
+        self._authorize(request, session_id)
+        self.service.clear(session_id)
+        return Response({"session_id": session_id, "cleared": True})
+
+    async def chat(self, request: Request, session_id: str):
+        payload = request.json()
+        message = str(payload.get("message", "")).strip()
+        if not message:
+            raise ApiError(400, "Please send a non-empty \"message\".")
+        return await self._turn(request, session_id, message, "Chat", request.wants_stream(payload))
+
+    async def tool(self, request: Request, session_id: str, label: str):
+        label = unquote(label)
+        payload = request.json()
+        topic = str(payload.get("topic", "")).strip()
+        if label == FULL_QUIZ:
+            return await self._quiz(request, session_id, topic)
+        instruction = tool_instruction(label)
+        if instruction is None:
+            raise ApiError(404, f"Unknown tool {label!r}; GET /tools lists them.")
+        if label in dict(NAVIGATION_TOOLS):
+            self._authorize(request, session_id)
+            # Answered from the concept timeline when possible, without a model call
+            messages = await self._run(self.service.history, session_id)
+            reply = self.service.navigate(session_id, messages, label)
+            if reply is not None:
+                self.service.add_message(session_id, messages, "user", label)
+                self.service.add_message(session_id, messages, "assistant", reply)
+                return Response({"reply": reply, "concept": current_concept(messages)})
+        # As when a sidebar button pre-fills the message and the topic is typed after it
+        message = f"{instruction} {topic}".strip()
+        return await self._turn(request, session_id, message, label, request.wants_stream(payload))
+
+    async def syllabus(self, request: Request, session_id: str):
+        self._authorize(request, session_id)
+        if not request.body:
+            raise ApiError(400, "Please send the syllabus file as the request body.")
+        upload = Upload(request.body, request.headers.get("content-type", "text/plain").split(";")[0].strip(),
+                        request.query.get("name", "syllabus"))
+        job = await self._run(self.service.attach, session_id, upload)
+        if job.status == "failed":
+            raise ApiError(415, job.error)
+        return Response(job.to_dict(), 202 if not job.finished else 200)
+
+    async def syllabus_progress(self, request: Request, session_id: str):
+        self._authorize(request, session_id)
+        conversation = self.service.conversation(session_id)
+        job = conversation.ingest_job
+        if job is None:
+            raise ApiError(404, "No syllabus is attached to this session.")
+        progress = job.to_dict()
+        # What chat turns use: the last file read successfully
+        progress["attached"] = conversation.upload.name if conversation.upload is not None else None
+        return Response(progress)
+
+    # Turns
+
+    def _prepare(self, api_key: str, session_id: str, message: str) -> List[Dict]:
+        """Record the student's message and build the request, as the apps' Send does"""
+        service = self.service
+        messages = service.history(session_id)
+        upload = service.conversation(session_id).upload
+        content = message
+        if upload is not None:
+            # Only a reference goes into the chat; relevant chunks are retrieved per turn
+            content += f"\n\n📎 **Attached file:** {upload.name}"
+        service.add_message(session_id, messages, "user", content)
+        return service.build_request(api_key, session_id, messages, upload=upload, question=message)
+
+    def _finish(self, session_id: str, reply: str) -> Response:
+        messages = self.service.history(session_id)
+        self.service.add_message(session_id, messages, "assistant", reply)
+        body = {"reply": reply, "concept": current_concept(messages)}
+        if reply.startswith("Error"):
+            return Response({"error": reply}, 502)
+        return Response(body)
+
+    async def _turn(self, request: Request, session_id: str, message: str, tool: str, stream: bool):
+        api_key = self._authorize(request, session_id)
+        llm_messages = await self._run(self._prepare, api_key, session_id, message)
+        if not stream:
+            reply = await self._run(self.service.complete, api_key, session_id, llm_messages, tool)
+            return self._finish(session_id, reply)
+
+        async def events():
+            parts = []
+            async for token in self._iterate(self.service.stream(api_key, session_id, llm_messages, tool)):
+                parts.append(token)
+                yield "token", {"text": token}
+            response = self._finish(session_id, "".join(parts))
+            yield "done", json.loads(response.body)
+
+        return EventStream(events())
+
+    async def _quiz(self, request: Request, session_id: str, topic: str):
+        api_key = self._authorize(request, session_id)
+        service = self.service
+
+        def run() -> Response:
+            messages = service.history(session_id)
+            quiz_topic = topic or current_concept(messages) or "the current topic"
+            # Shared context for every quiz section, built before the quiz request is logged
+            quiz_messages = service.build_request(api_key, session_id, messages)
+            service.add_message(session_id, messages, "user", f"📝 Generate a full quiz on {quiz_topic}")
+            return self._finish(session_id, service.quiz(api_key, session_id, quiz_messages, QUIZ_TYPES, quiz_topic))
+
+        return await self._run(run)
+
+
+app = TutorAPI()
@@ -0,0 +1,104 @@
+"""Process-wide registry of the sidebar icons.
+
+Every file under ``assets/icons/`` is read and base64-encoded once per
+process, so Streamlit reruns do no filesystem I/O for icons.  Icons are
+looked up by file name, case-insensitively.
+"""
+import base64
+import mimetypes
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "icons")
+# Render sidebar icons from one CSS sprite sheet instead of per-icon images
+ICON_SPRITE = os.environ.get("LEARNER_ICON_SPRITE", "0") == "1"
+
+
+class IconRegistry:
+    """Raw bytes and data URIs of every icon in a directory"""
+
+    def __init__(self, directory: str = ICON_DIR):
+        self.directory = directory
+        self.icons: Dict[str, bytes] = {}
+        self.data_uris: Dict[str, str] = {}
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if not os.path.isfile(path):
+                    continue
+                with open(path, "rb") as icon_file:
+                    data = icon_file.read()
+                mime = mimetypes.guess_type(name)[0] or "image/png"
+                key = name.lower()
+                self.icons[key] = data
+                self.data_uris[key] = f"data:{mime};base64,{base64.b64encode(data).decode()}"
+        self._tags: Dict[tuple, str] = {}
+        self._sprite_css: Dict[tuple, str] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.basename(path).lower()
+
+    def get(self, path: str) -> Optional[bytes]:
+        """Icon bytes for a path like ``assets/icons/next.png``"""
+        return self.icons.get(self._key(path))
+
+    def data_uri(self, path: str) -> Optional[str]:
+        return self.data_uris.get(self._key(path))
+
+    def img_tag(self, path: str, width: int = 16) -> str:
+        """Inline <img> tag for an icon, or "" when it is missing"""
+        key = (self._key(path), width)
+        tag = self._tags.get(key)
+        if tag is None:
+            uri = self.data_uri(path)
+            if uri is None:
+                return ""
+            tag = f'<img src="{uri}" width="{width}" style="vertical-align:middle;margin-right:8px">'
+            self._tags[key] = tag
+        return tag
+
+    @staticmethod
+    def css_class(path: str) -> str:
+        stem = os.path.splitext(os.path.basename(path))[0].lower()
+        return "learner-icon-" + "".join(c if c.isalnum() else "-" for c in stem)
+
+    def sprite_css(self, paths: Iterable[str], size: int = 24) -> str:
+        """One stylesheet holding the given icons, for the sprite rendering mode
+
+        Only the icons asked for go in; the directory also holds large images
+        (the logo) that have no place in a stylesheet.
+        """
+        keys = tuple(sorted({self._key(path) for path in paths}))
+        css = self._sprite_css.get((keys, size))
+        if css is None:
+            rules = [
+                f".learner-icon{{display:inline-block;width:{size}px;height:{size}px;"
+                f"background-size:contain;background-repeat:no-repeat;vertical-align:middle}}"
+            ]
+            for key in keys:
+                uri = self.data_uris.get(key)
+                if uri is not None:
+                    rules.append(f".{self.css_class(key)}{{background-image:url('{uri}')}}")
+            css = "\n".join(rules)
+            self._sprite_css[(keys, size)] = css
+        return css
+
+    def sprite_tag(self, path: str) -> str:
+        """Markup showing one icon from the sprite stylesheet"""
+        return f'<span class="learner-icon {self.css_class(path)}"></span>'
+
+
+_registry: Optional[IconRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_icons() -> IconRegistry:
+    """The process-wide icon registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = IconRegistry()
+    return _registry
@@ -0,0 +1,205 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+When a whole class presses the same sidebar button on the same syllabus,
+the requests are identical.  The first one (the leader) goes upstream;
+requests with the same key that arrive while it is in flight wait for it
+and receive its reply instead of making their own call.  Only replies are
+shared: a leader's error may be its own (a rejected key, its key's rate
+limit), so when the leader fails each follower makes its own call.
+
+Streams are shared the same way: the upstream stream is read on a
+background thread into a buffer, and every caller replays that buffer from
+the first token, so a student who joins late still sees the whole reply.
+A leader failing before its first token is retried by each follower as
+above; a failure part-way through reaches every reader.  Once a request
+finishes, its key is free again; repeats after that are the response
+cache's job.
+"""
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .response_cache import cache_key
+
+
+def request_key(model: str, messages: List[Dict]) -> str:
+    """Coalescing key: a hash of the model and the normalized messages"""
+    return cache_key(model, messages)
+
+
+class _Call:
+    """A blocking call in flight, and what it produced"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class _Broadcast:
+    """A stream in flight: the tokens so far and whether it has ended"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    def replay(self) -> Iterator[str]:
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.tokens) and not self.finished:
+                    self.cond.wait()
+                fresh = self.tokens[index:]
+                index = len(self.tokens)
+                finished = self.finished
+            # Yield outside the lock so slow readers do not hold up the producer
+            yield from fresh
+            if finished and index >= len(self.tokens):
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class FlightStream:
+    """Tokens of a coalesced stream; ``shared`` tells whether another request paid for them"""
+
+    def __init__(self, broadcast: _Broadcast, fn: Callable[[], Iterator[str]], leader: bool,
+                 flight: "SingleFlight"):
+        self.shared = not leader
+        self._tokens = self._run(broadcast, fn, flight)
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        return next(self._tokens)
+
+    def _run(self, broadcast: _Broadcast, fn: Callable[[], Iterator[str]],
+             flight: "SingleFlight") -> Iterator[str]:
+        started = False
+        try:
+            for token in broadcast.replay():
+                started = True
+                yield token
+        except Exception:
+            if not self.shared or started:
+                raise
+            # The leader failed before answering; its error may not apply to us
+            self.shared = False
+            flight._count("retried")
+            yield from fn()
+
+
+class SingleFlight:
+    """Shares one upstream call among concurrent identical requests"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.upstream = 0
+        self.collapsed = 0
+        # Followers that made their own call after the leader failed
+        self.retried = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        """Return ``fn()``, or the result of an identical call already in flight"""
+        return self.flight(key, fn)[0]
+
+    def flight(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """Like :meth:`do`, also telling whether the result was shared from another caller"""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.upstream += 1
+            else:
+                self.collapsed += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+        call.done.wait()
+        if call.error is not None:
+            # Only successes are shared; the leader's error may be its own
+            self._count("retried")
+            return fn(), False
+        return call.result, True
+
+    def stream(self, key: str, fn: Callable[[], Iterator[str]]) -> FlightStream:
+        """Tokens of ``fn()``, shared with identical streams already in flight"""
+        with self._lock:
+            self.requests += 1
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+                self.upstream += 1
+                # The upstream read must not depend on any one reader staying connected
+                threading.Thread(target=self._pump, args=(key, broadcast, fn),
+                                 name="learner-single-flight", daemon=True).start()
+            else:
+                self.collapsed += 1
+        return FlightStream(broadcast, fn, leader, self)
+
+    def _pump(self, key: str, broadcast: _Broadcast, fn: Callable[[], Iterator[str]]):
+        try:
+            for token in fn():
+                with broadcast.cond:
+                    broadcast.tokens.append(token)
+                    broadcast.cond.notify_all()
+        except BaseException as e:
+            broadcast.error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with broadcast.cond:
+                broadcast.finished = True
+                broadcast.cond.notify_all()
+
+    def coalesced(self, complete: Callable[[str, List[Dict]], str], model: str,
+                  shared: Optional[Set[int]] = None) -> Callable[[str, List[Dict]], str]:
+        """Wrap a ``complete(api_key, messages)`` function so identical calls share one flight
+
+        The ``id()`` of each messages list whose reply was shared is added to ``shared``.
+        """
+        def wrapper(api_key: str, messages: List[Dict]) -> str:
+            reply, was_shared = self.flight(request_key(model, messages), lambda: complete(api_key, messages))
+            if was_shared and shared is not None:
+                shared.add(id(messages))
+            return reply
+        return wrapper
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream": self.upstream,
+                "collapsed": self.collapsed,
+                "retried": self.retried,
+                "in_flight": len(self._calls) + len(self._streams),
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """The process-wide coalescer shared by every session"""
+    return _single_flight
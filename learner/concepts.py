@@ -0,0 +1,122 @@
+"""Concept timeline parsed from the tutor's 'Current Concept:' trailers.
+
+The tutor ends each reply with ``Current Concept:[...]``, sometimes followed
+by a question for the student.  The timeline parses only messages it has
+not seen yet, so keeping it current costs O(new messages) per turn, and
+"previous concept" and "concept history" are answered from it without a
+model call.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# The trailer is a line of its own, possibly wrapped in markdown
+# ("**Current Concept:** [Photosynthesis]").  It usually ends the reply, but
+# the tutor is also told to ask where to start, and that question can follow it
+_TRAILER_RE = re.compile(r"^Current Concept\s*:\s*(.*)$", re.IGNORECASE)
+_MARKUP_RE = re.compile(r"[*`]+")
+
+
+def _trailer_concept(line: str, last: bool) -> Optional[str]:
+    trailer = _MARKUP_RE.sub("", line).strip().lstrip("#>-'\" ").strip()
+    match = _TRAILER_RE.match(trailer)
+    if match is None:
+        return None
+    concept = match.group(1).strip().rstrip("'\"")
+    if concept.endswith("]."):
+        concept = concept[:-1]
+    # Only the outer brackets go, so "[Intro [Part 1]]" keeps its inner pair
+    if concept.startswith("["):
+        concept = concept[1:-1] if concept.endswith("]") else concept[1:]
+    elif not last:
+        # Before other text only the bracketed form counts, so a sentence
+        # like "Current concept: cells divide." is left alone
+        return None
+    concept = concept.strip().strip("'\"").strip()
+    return concept or None
+
+
+def split_trailer(text: str) -> Tuple[str, Optional[str]]:
+    """A reply without its last 'Current Concept:' trailer line, and the concept it names"""
+    lines = text.strip().splitlines()
+    for index in range(len(lines) - 1, -1, -1):
+        concept = _trailer_concept(lines[index], last=index == len(lines) - 1)
+        if concept is not None:
+            before = "\n".join(lines[:index]).rstrip()
+            after = "\n".join(lines[index + 1:]).strip()
+            return "\n\n".join(part for part in (before, after) if part), concept
+    return text, None
+
+
+def parse_concept(text: str) -> Optional[str]:
+    """The concept named in the reply's last 'Current Concept:' trailer"""
+    return split_trailer(text)[1]
+
+
+class ConceptTimeline:
+    """Per-session record of concept transitions"""
+
+    def __init__(self):
+        # Every change of concept, in order: {"concept", "message_index", "timestamp"}
+        self.transitions: List[Dict] = []
+        # Distinct concepts in first-visit order, and each one's position
+        self.order: List[str] = []
+        self._position: Dict[str, int] = {}
+        self._parsed_upto = 0
+
+    def update(self, messages: List[Dict[str, str]]):
+        """Parse assistant replies added since the last update"""
+        if len(messages) < self._parsed_upto:
+            # The chat was cleared
+            self.__init__()
+        for index in range(self._parsed_upto, len(messages)):
+            message = messages[index]
+            if message["role"] != "assistant":
+                continue
+            concept = parse_concept(message["content"])
+            if concept is None or concept == self.current():
+                continue
+            self.transitions.append({
+                "concept": concept,
+                "message_index": index,
+                "timestamp": message.get("timestamp", ""),
+            })
+            if concept not in self._position:
+                self._position[concept] = len(self.order)
+                self.order.append(concept)
+        self._parsed_upto = len(messages)
+
+    def current(self) -> Optional[str]:
+        return self.transitions[-1]["concept"] if self.transitions else None
+
+    def previous(self) -> Optional[str]:
+        """The concept first covered just before the current one"""
+        current = self.current()
+        if current is None:
+            return None
+        position = self._position[current]
+        return self.order[position - 1] if position > 0 else None
+
+    def history_markdown(self) -> str:
+        """Concepts covered so far, in the order they were first reached"""
+        if not self.order:
+            return "We haven't covered any concepts yet."
+        current = self.current()
+        lines = [
+            f"{i}. **{concept}**" + (" ← current" if concept == current else "")
+            for i, concept in enumerate(self.order, 1)
+        ]
+        return "Concepts we have covered so far:\n\n" + "\n".join(lines)
+
+    def to_dicts(self) -> List[Dict]:
+        """The transitions, for analytics export"""
+        return [dict(transition) for transition in self.transitions]
+
+
+def current_concept(messages: List[Dict[str, str]]) -> Optional[str]:
+    """The concept named in the newest assistant 'Current Concept:' trailer"""
+    for msg in reversed(messages):
+        if msg["role"] == "assistant":
+            concept = parse_concept(msg["content"])
+            if concept:
+                return concept
+    return None
@@ -0,0 +1,132 @@
+"""Token-budgeted context window with rolling summaries of older turns.
+
+The newest turns are sent verbatim while they fit the budget.  Turns that
+slide out of the window are folded into a running summary kept in a
+per-session ``state`` dict, so each turn is summarized exactly once.
+Summarizing is a model call, so it is kept off the request path: until the
+new summary is ready, requests carry the previous one and keep the turns
+being folded verbatim.
+"""
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rough estimate that holds well enough for English prose on most tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message overhead for role markers and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CONTEXT_TOKENS = int(os.environ.get("LEARNER_CONTEXT_TOKENS", "4000"))
+SUMMARY_TOKENS = int(os.environ.get("LEARNER_SUMMARY_TOKENS", "400"))
+
+SUMMARY_INSTRUCTION = (
+    "Summarize this tutoring conversation for the tutor's own notes. Keep the "
+    "syllabus topics covered, the current concept, what the student struggled "
+    "with and any open questions. Answer with the summary only, at most {words} words."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the tokens a chat message costs in a request"""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def new_context_state() -> Dict:
+    """Empty per-session summary cache"""
+    # ``epoch`` changes when the history is replaced, so a summary of the old
+    # history that lands late is dropped
+    return {"summary": "", "summarized_upto": 0, "summarizing": False, "epoch": 0}
+
+
+def summary_request(previous_summary: str, turns: List[Dict[str, str]],
+                    max_tokens: int = SUMMARY_TOKENS) -> List[Dict[str, str]]:
+    """Messages asking the model to fold new turns into the running summary"""
+    transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in turns)
+    content = SUMMARY_INSTRUCTION.format(words=max_tokens * 3 // 4)
+    if previous_summary:
+        content += f"\n\nSummary so far:\n{previous_summary}"
+    content += f"\n\nNew turns:\n{transcript}"
+    return [{"role": "user", "content": content}]
+
+
+def _fallback_summary(previous_summary: str, turns: List[Dict[str, str]],
+                      max_tokens: int) -> str:
+    """Extractive summary used when the summarizer fails"""
+    lines = [previous_summary] if previous_summary else []
+    lines += [f"{m['role']}: {m['content'][:200]}" for m in turns]
+    # Keep the most recent material when over budget
+    return "\n".join(lines)[-max_tokens * CHARS_PER_TOKEN:]
+
+
+def _window_start(messages: List[Dict[str, str]], floor: int, available: int) -> int:
+    """Index of the oldest message that still fits in ``available`` tokens"""
+    # Walk back from the newest turn, always keeping at least the latest one
+    start = len(messages)
+    used = 0
+    while start > floor:
+        cost = message_tokens(messages[start - 1])
+        if used + cost > available and start < len(messages):
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def _sync_state(messages: List[Dict[str, str]], state: Dict):
+    if state.get("summarized_upto", 0) > len(messages):
+        # History was cleared or replaced underneath us
+        state.update(new_context_state(), epoch=state.get("epoch", 0) + 1)
+
+
+def build_context(messages: List[Dict[str, str]], state: Dict) -> List[Dict[str, str]]:
+    """The messages to send: the rolling summary, then every turn it does not cover
+
+    Once :func:`summary_due` has asked for a new summary, the turns it folds
+    are sent verbatim until :func:`fold_turns` has produced it.
+    """
+    _sync_state(messages, state)
+    window = [{"role": m["role"], "content": m["content"]}
+              for m in messages[state.get("summarized_upto", 0):]]
+    if state.get("summary"):
+        window.insert(0, {
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{state['summary']}"
+        })
+    return window
+
+
+def summary_due(messages: List[Dict[str, str]],
+                state: Dict,
+                budget_tokens: int = CONTEXT_TOKENS,
+                summary_tokens: int = SUMMARY_TOKENS) -> Optional[Tuple[int, List[Dict[str, str]]]]:
+    """Turns to fold into the summary, and the index after them
+
+    None while the turns the summary does not cover fit ``budget_tokens``,
+    or while a summary is already being made.
+    """
+    _sync_state(messages, state)
+    if state.get("summarizing"):
+        return None
+    summarized_upto = state.get("summarized_upto", 0)
+    available = budget_tokens - summary_tokens
+    if _window_start(messages, summarized_upto, available) == summarized_upto:
+        return None
+    # Slide by half a window at a time so the summarizer runs every few
+    # turns rather than on every turn once the budget is full
+    start = _window_start(messages, summarized_upto, available // 2)
+    return start, messages[summarized_upto:start]
+
+
+def fold_turns(previous_summary: str,
+               turns: List[Dict[str, str]],
+               summarize: Callable[[str, List[Dict[str, str]]], str],
+               summary_tokens: int = SUMMARY_TOKENS) -> str:
+    """``summarize(previous_summary, turns)``, or an extractive summary if it fails"""
+    try:
+        return summarize(previous_summary, turns)
+    except Exception:
+        return _fallback_summary(previous_summary, turns, summary_tokens)
@@ -0,0 +1,283 @@
+"""Syllabus text extraction with a process-wide, content-addressed cache.
+
+Uploads are keyed by the SHA-256 of their bytes, so the same file attached
+by many students (or on every Send while it stays attached) is parsed once.
+
+Parsers are registered per MIME type and import their backend library
+(PyPDF2, python-docx) only when the first such file arrives, so sessions
+that never attach a file never pay for loading them.
+"""
+import hashlib
+import importlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Legacy .doc files (application/msword) are not zip archives; python-docx
+# cannot read them, so they are left unsupported
+DOCX_TYPES = [
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+]
+
+# Memory bound for cached text, in megabytes
+EXTRACT_CACHE_MB = int(os.environ.get("LEARNER_EXTRACT_CACHE_MB", "64"))
+# Worker processes for full-text PDF extraction (0 disables the pool)
+PDF_PROCESSES = int(os.environ.get("LEARNER_PDF_PROCESSES", "0"))
+# Smaller PDFs are not worth the cost of shipping bytes to worker processes
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("LEARNER_PDF_PARALLEL_MIN_PAGES", "300"))
+# How the worker processes start.  Forking a server that has threads running
+# can copy locks held by those threads into a child that never releases them
+PDF_START_METHOD = os.environ.get(
+    "LEARNER_PDF_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class UnsupportedFileType(ValueError):
+    """Raised for uploads we have no parser for"""
+
+
+def _backend(module: str):
+    """Import a parser library on first use"""
+    return importlib.import_module(module)
+
+
+def iter_pdf_pages(data: bytes, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Lazily yield the text of each PDF page that has any"""
+    pdf_reader = _backend("PyPDF2").PdfReader(io.BytesIO(data))
+    pages = pdf_reader.pages
+    for index in range(start, len(pages) if stop is None else stop):
+        page_text = pages[index].extract_text()
+        if page_text:
+            yield page_text
+
+
+# Per-process copy of the PDF being extracted by the pool workers
+_worker_pdf: Optional[bytes] = None
+
+
+def _init_pdf_worker(data: bytes):
+    global _worker_pdf
+    _worker_pdf = data
+
+
+def _extract_page_range(bounds) -> List[str]:
+    return list(iter_pdf_pages(_worker_pdf, *bounds))
+
+
+def _pdf_pool(processes: int, data: bytes) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context(PDF_START_METHOD),
+                               initializer=_init_pdf_worker, initargs=(data,))
+
+
+def _extract_pdf_parallel(data: bytes, page_count: int, processes: int) -> List[str]:
+    """Extract all pages in contiguous ranges across a process pool"""
+    step = -(-page_count // (processes * 4))  # a few ranges per worker to balance load
+    ranges = [(i, min(i + step, page_count)) for i in range(0, page_count, step)]
+    with _pdf_pool(processes, data) as pool:
+        return [text for chunk in pool.map(_extract_page_range, ranges) for text in chunk]
+
+
+def extract_pdf_text(data: bytes, max_chars: Optional[int] = None,
+                     processes: int = PDF_PROCESSES) -> str:
+    """Extract PDF text, stopping once ``max_chars`` is reached
+
+    Full-text extraction of large PDFs is spread over ``processes`` workers.
+    """
+    if max_chars is None and processes > 1:
+        page_count = len(_backend("PyPDF2").PdfReader(io.BytesIO(data)).pages)
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            pages = _extract_pdf_parallel(data, page_count, processes)
+            return "".join(text + "\n" for text in pages)
+    parts = []
+    size = 0
+    for page_text in iter_pdf_pages(data):
+        parts.append(page_text + "\n")
+        size += len(page_text) + 1
+        if max_chars is not None and size >= max_chars:
+            break
+    return "".join(parts)
+
+
+def iter_pdf_batches(data: bytes, batch_pages: int,
+                     processes: int = PDF_PROCESSES) -> Iterator[Tuple[str, int, int]]:
+    """Text of a PDF a batch of pages at a time, as ``(text, pages_done, page_count)``
+
+    Large PDFs are spread over ``processes`` workers; batches still arrive in
+    page order.
+    """
+    pdf_reader = _backend("PyPDF2").PdfReader(io.BytesIO(data))
+    page_count = len(pdf_reader.pages)
+    ranges = [(i, min(i + batch_pages, page_count)) for i in range(0, page_count, batch_pages)]
+    if processes > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+        with _pdf_pool(processes, data) as pool:
+            for (_, stop), pages in zip(ranges, pool.map(_extract_page_range, ranges)):
+                yield "".join(text + "\n" for text in pages), stop, page_count
+        return
+    for start, stop in ranges:
+        texts = (pdf_reader.pages[index].extract_text() for index in range(start, stop))
+        yield "".join(text + "\n" for text in texts if text), stop, page_count
+
+
+def _parse_text(data: bytes, max_chars: Optional[int]) -> str:
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Most text that is not UTF-8 was saved by Windows in its Latin code page
+        return data.decode("cp1252", errors="replace")
+
+
+def _parse_pdf(data: bytes, max_chars: Optional[int]) -> str:
+    text = extract_pdf_text(data, max_chars)
+    return text if text else "No extractable text found in PDF."
+
+
+def _parse_docx(data: bytes, max_chars: Optional[int]) -> str:
+    doc = _backend("docx").Document(io.BytesIO(data))
+    return "\n".join([para.text for para in doc.paragraphs])
+
+
+# MIME type -> parser(data, max_chars); the file extension decides when the
+# browser reports a generic type
+_parsers: Dict[str, Callable[[bytes, Optional[int]], str]] = {
+    "text/plain": _parse_text,
+    "application/pdf": _parse_pdf,
+}
+_parsers.update({mime: _parse_docx for mime in DOCX_TYPES})
+_extensions: Dict[str, str] = {
+    ".txt": "text/plain",
+    ".pdf": "application/pdf",
+    ".docx": DOCX_TYPES[0],
+}
+
+
+def register_parser(mime: str, parser: Callable[[bytes, Optional[int]], str],
+                    extension: Optional[str] = None):
+    """Add or replace the parser for a MIME type (and optionally a file extension)"""
+    _parsers[mime] = parser
+    if extension:
+        _extensions[extension.lower()] = mime
+
+
+def parser_for(mime: str, name: str = "") -> Callable[[bytes, Optional[int]], str]:
+    """The registered parser for an upload, by MIME type then file extension"""
+    parser = _parsers.get(mime)
+    if parser is None:
+        ext_mime = _extensions.get(os.path.splitext(name)[1].lower())
+        parser = _parsers.get(ext_mime) if ext_mime else None
+    if parser is None:
+        raise UnsupportedFileType(mime)
+    return parser
+
+
+def extract_text(data: bytes, mime: str, name: str = "", max_chars: Optional[int] = None) -> str:
+    """Extract text from raw upload bytes (.txt, .pdf, .docx)
+
+    ``max_chars`` lets parsers stop early; the result may still be longer.
+    """
+    return parser_for(mime, name)(data, max_chars)
+
+
+def is_pdf(mime: str, name: str = "") -> bool:
+    """Whether an upload is parsed as a PDF"""
+    return parser_for(mime, name) is _parse_pdf
+
+
+def iter_extracted(data: bytes, mime: str, name: str = "",
+                   batch_pages: int = 20) -> Iterator[Tuple[str, int, int]]:
+    """Extract an upload incrementally, as ``(text, parts_done, part_count)``
+
+    PDFs come a batch of pages at a time; other files in one piece.
+    """
+    parser = parser_for(mime, name)
+    if parser is _parse_pdf:
+        yield from iter_pdf_batches(data, batch_pages)
+    else:
+        yield parser(data, None), 1, 1
+
+
+class ExtractionCache:
+    """Thread-safe LRU of extracted text, bounded by the memory it holds"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *keys) -> Optional[str]:
+        """Text under the first of ``keys`` that is cached"""
+        with self._lock:
+            for key in keys:
+                text = self._entries.get(key)
+                if text is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return text
+            self.misses += 1
+            return None
+
+    def put(self, key, text: str):
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= sys.getsizeof(self._entries.pop(key))
+            self._entries[key] = text
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= sys.getsizeof(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = ExtractionCache(EXTRACT_CACHE_MB * 1024 * 1024)
+
+
+def content_key(data: bytes) -> str:
+    """Content address of an upload"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def extract_text_cached(data: bytes, mime: str, name: str = "", max_chars: Optional[int] = None) -> str:
+    """Extract text, parsing each distinct upload only once per process"""
+    digest = content_key(data)
+    # A cached full text also answers any prefix request
+    text = _cache.get((digest, None), (digest, max_chars))
+    if text is None:
+        text = extract_text(data, mime, name, max_chars)
+        _cache.put((digest, max_chars), text)
+    return text
+
+
+def cached_text(key: str) -> Optional[str]:
+    """Full text of an upload extracted earlier in this process, if still cached"""
+    return _cache.get((key, None))
+
+
+def cache_extracted(key: str, text: str):
+    """Seed the cache with the full text of an upload extracted elsewhere"""
+    _cache.put((key, None), text)
+
+
+def extraction_cache_stats() -> Dict[str, int]:
+    """Entries, memory held and hit/miss counts of the shared cache"""
+    return _cache.stats()
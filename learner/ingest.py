@@ -0,0 +1,248 @@
+"""Background syllabus ingestion.
+
+Parsing an attached PDF used to happen inline on the first Send after it was
+attached, blocking that session's script thread for as long as PyPDF2 took.
+:class:`IngestQueue` runs extraction, chunking and indexing as a job on a
+small worker pool instead.  A job reads a batch of pages at a time and
+publishes a fresh index over everything read so far as it grows, so
+retrieval works on the opening chapters while the rest of a textbook is
+still being read.  Jobs are keyed by content, so a file attached by a whole class is
+ingested once.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .extraction import (UnsupportedFileType, cache_extracted, cached_text, content_key, is_pdf, iter_extracted,
+                         parser_for)
+from .metrics import observe, span
+from .retrieval import SyllabusIndex, cached_index, chunk_text, put_index
+
+# Uploads ingested at once per process
+INGEST_WORKERS = int(os.environ.get("LEARNER_INGEST_WORKERS", "2"))
+# PDF pages read between publishing new chunks
+INGEST_BATCH_PAGES = int(os.environ.get("LEARNER_INGEST_BATCH_PAGES", "20"))
+# Seconds a Send waits for a running job before using the chunks ready so far
+INGEST_WAIT = float(os.environ.get("LEARNER_INGEST_WAIT", "1.0"))
+# Finished jobs remembered, oldest dropped first
+INGEST_JOBS = 64
+
+
+class IngestJob:
+    """Progress and results of ingesting one upload
+
+    ``index`` is replaced, never mutated, as batches finish; readers take
+    one reference and use that snapshot.
+    """
+
+    def __init__(self, key: str, name: str, mime: str):
+        self.key = key
+        self.name = name
+        self.mime = mime
+        self.status = "queued"
+        self.parts_done = 0
+        self.part_count: Optional[int] = None
+        self.index: Optional[SyllabusIndex] = None
+        self.error: Optional[str] = None
+        self.submitted = time.time()
+        self.seconds: Optional[float] = None
+        # Chunks read but not yet in the index
+        self._unindexed: List[str] = []
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._callbacks: List[Callable[["IngestJob"], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def progress(self) -> float:
+        if self.finished:
+            return 1.0
+        return self.parts_done / self.part_count if self.part_count else 0.0
+
+    @property
+    def chunk_count(self) -> int:
+        index = self.index
+        return len(index.chunks) if index is not None else 0
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or ``timeout`` passes; True if finished"""
+        return self._done.wait(timeout)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first chunks are searchable (or the job ends)"""
+        return self._ready.wait(timeout)
+
+    def on_done(self, callback: Callable[["IngestJob"], None]):
+        """Call ``callback(job)`` once the job finishes, right away if it has"""
+        with self._callbacks_lock:
+            if not self.finished:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _publish(self, chunks: List[str], parts_done: int, part_count: int, final: bool = False):
+        self._unindexed.extend(chunks)
+        indexed = self.index.chunks if self.index is not None else []
+        # Re-indexing everything on every batch would be quadratic in the book's
+        # length; the index is rebuilt once the new chunks reach half its size
+        if self._unindexed and (final or len(self._unindexed) * 2 >= len(indexed)):
+            self.index = SyllabusIndex(indexed + self._unindexed)
+            self._unindexed = []
+            self._ready.set()
+        self.parts_done, self.part_count = parts_done, part_count
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.seconds = round(time.time() - self.submitted, 3)
+        self._ready.set()
+        with self._callbacks_lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "type": self.mime,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "parts_done": self.parts_done,
+            "part_count": self.part_count,
+            "chunks": self.chunk_count,
+            "error": self.error,
+            "seconds": self.seconds,
+        }
+
+
+def _read_error(upload, error: Exception) -> str:
+    if isinstance(error, UnsupportedFileType):
+        return f"File type {upload.type} is not supported. Please upload a .txt, .pdf, or .docx file."
+    return f"Error reading file: {str(error)}"
+
+
+class IngestQueue:
+    """Worker pool ingesting uploads, one job per distinct file"""
+
+    def __init__(self, workers: int = INGEST_WORKERS, batch_pages: int = INGEST_BATCH_PAGES,
+                 max_jobs: int = INGEST_JOBS):
+        self.workers = workers
+        self.batch_pages = batch_pages
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        # Streamlit upload id -> content key, so reruns do not rehash the file
+        self._keys: "OrderedDict[str, str]" = OrderedDict()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def key_for(self, upload) -> str:
+        file_id = getattr(upload, "file_id", None)
+        if file_id is None:
+            return content_key(upload.getvalue())
+        with self._lock:
+            key = self._keys.get(file_id)
+        if key is None:
+            key = content_key(upload.getvalue())
+            with self._lock:
+                self._keys[file_id] = key
+                while len(self._keys) > self.max_jobs:
+                    self._keys.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, upload) -> IngestJob:
+        """The job for an upload, started on first sight; cheap to call on every rerun
+
+        A job that failed starts over when its file is submitted again.
+        """
+        key = self.key_for(upload)
+        with self._lock:
+            job = self._jobs.get(key)
+            # A failed job is retried when the same file comes again
+            if job is not None and job.status != "failed":
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = IngestJob(key, upload.name, upload.type)
+            self._trim()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="learner-ingest")
+        try:
+            parser_for(upload.type, upload.name)
+        except UnsupportedFileType as e:
+            job._finish("failed", _read_error(upload, e))
+            return job
+        index = cached_index(key)
+        if index is not None:
+            # Already indexed by an earlier job or an inline read
+            job.index = index
+            job.parts_done = job.part_count = 1
+            job._finish("done")
+            return job
+        self._pool.submit(self._run, job, upload)
+        return job
+
+    def _trim(self):
+        finished = [key for key, job in self._jobs.items() if job.finished]
+        for key in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[key]
+
+    def _run(self, job: IngestJob, upload):
+        job.status = "running"
+        observe("ingest_queued", time.time() - job.submitted)
+        text = cached_text(job.key)
+        if text is not None:
+            # Read before, and its index since evicted; only the indexing is redone
+            with span("ingest"):
+                job._publish(chunk_text(text), 1, 1, final=True)
+            put_index(job.key, job.index if job.index is not None else SyllabusIndex([]))
+            job._finish("done")
+            return
+        parts, pending = [], ""
+        try:
+            with span("ingest"):
+                for text, done, count in iter_extracted(upload.getvalue(), job.mime, job.name, self.batch_pages):
+                    parts.append(text)
+                    # The last chunk of a batch may continue on the next page, so it
+                    # is held back and chunked again with the next batch
+                    chunks = chunk_text(pending + text)
+                    pending = chunks.pop() + "\n" if chunks and done < count else ""
+                    job._publish(chunks, done, count, final=done >= count)
+                full_text = "".join(parts)
+                if not full_text:
+                    kind = "PDF" if is_pdf(job.mime, job.name) else "file"
+                    full_text = f"No extractable text found in {kind}."
+                    job._publish(chunk_text(full_text), job.parts_done, job.part_count or 1, final=True)
+        except Exception as e:
+            job._finish("failed", _read_error(upload, e))
+            return
+        # Later readers of the same file find the text and index ready
+        cache_extracted(job.key, full_text)
+        put_index(job.key, job.index if job.index is not None else SyllabusIndex([]))
+        job._finish("done")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {"jobs": len(jobs), "queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+
+_queue = IngestQueue()
+
+
+def get_ingest_queue() -> IngestQueue:
+    """The process-wide ingestion queue"""
+    return _queue
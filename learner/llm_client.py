@@ -0,0 +1,307 @@
+"""Process-wide, connection-pooled HTTP client for the OpenRouter API.
+
+Every Streamlit session in the process shares one ``requests.Session`` so
+chat turns reuse keep-alive connections instead of paying a new TCP+TLS
+handshake each time.
+"""
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import span
+from .prompts import for_model
+from .ratelimit import RateLimitExceeded, limiter_for
+from .response_cache import get_response_cache
+from .usage import report_cached, report_usage
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_MODEL = "google/gemma-3n-e4b-it:free"
+
+# Pool sizing, overridable from the environment
+POOL_CONNECTIONS = int(os.environ.get("LEARNER_POOL_CONNECTIONS", "4"))  # distinct hosts kept pooled
+POOL_MAXSIZE = int(os.environ.get("LEARNER_POOL_MAXSIZE", "32"))  # keep-alive sockets per host
+POOL_BLOCK = os.environ.get("LEARNER_POOL_BLOCK", "0") == "1"  # hard per-host limit when set
+# Seconds to establish a connection and to wait between bytes of the reply
+CONNECT_TIMEOUT = float(os.environ.get("LEARNER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("LEARNER_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.environ.get("LEARNER_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("LEARNER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("LEARNER_BACKOFF_MAX", "20"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Upstream calls the async batch API may have in flight across the whole process
+ASYNC_CONCURRENCY = int(os.environ.get("LEARNER_ASYNC_CONCURRENCY", "8"))
+
+_lock = threading.RLock()
+_session: Optional[requests.Session] = None
+# Worker threads for the async API; their count bounds concurrency across all batches
+_async_executor = ThreadPoolExecutor(ASYNC_CONCURRENCY, thread_name_prefix="learner-llm")
+
+
+class LLMError(Exception):
+    """Non-200 answer from the chat-completions endpoint"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def configure_client(pool_connections: Optional[int] = None,
+                     pool_maxsize: Optional[int] = None,
+                     pool_block: Optional[bool] = None) -> requests.Session:
+    """(Re)build the shared session with the given pool limits"""
+    global _session
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or POOL_MAXSIZE,
+        pool_block=POOL_BLOCK if pool_block is None else pool_block,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with _lock:
+        old, _session = _session, session
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use"""
+    with _lock:
+        if _session is None:
+            return configure_client()
+        return _session
+
+
+def connection_stats() -> Dict[str, int]:
+    """Report requests served and how many of them reused a pooled connection"""
+    served = 0
+    opened = 0
+    session = _session
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    # Evicted between keys() and lookup
+                    continue
+                served += pool.num_requests
+                opened += pool.num_connections
+    return {
+        "requests": served,
+        "connections_opened": opened,
+        "connections_reused": max(served - opened, 0),
+    }
+
+
+def iter_sse_content(response: requests.Response,
+                     on_usage: Optional[Callable[[Dict], None]] = None) -> Iterator[str]:
+    """Yield content deltas from an OpenAI-compatible ``stream: true`` response
+
+    ``on_usage`` receives the ``usage`` block that closes the stream, if any.
+    """
+    # SSE responses rarely declare a charset; without one requests yields bytes
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        # Skip event separators and ": OPENROUTER PROCESSING" keep-alive comments
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", str(chunk["error"])))
+        if chunk.get("usage") and on_usage is not None:
+            on_usage(chunk["usage"])
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
+
+def _request_parts(api_key: str, messages: List[Dict], model: str, stream: bool = False):
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": m["role"], "content": m["content"]} for m in for_model(messages, model)
+        ]
+    }
+    if stream:
+        payload["stream"] = True
+    return headers, json.dumps(payload)
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds the server asked us to wait, from a Retry-After header"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(when.timestamp() - time.time(), 0.0)
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _post(url: str, headers: Dict[str, str], body: str, stream: bool = False,
+          retries: Optional[int] = None) -> requests.Response:
+    """POST with timeouts, rate limiting and retries on 429/5xx and network errors"""
+    retries = MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        with span("rate_limit_wait"):
+            # Paced per key: provider rate limits apply to each key separately
+            limiter_for(url, headers.get("Authorization", "")).acquire()
+        try:
+            # Up to the response headers; a non-streamed body is read by then too
+            with span("http"):
+                response = get_session().post(url, headers=headers, data=body, stream=stream,
+                                              timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        delay = _retry_after(response)
+        if delay is None:
+            delay = _backoff(attempt)
+        elif delay > BACKOFF_MAX:
+            # Not worth holding a script thread that long
+            return response
+        response.close()
+        time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def friendly_error(error: Exception) -> str:
+    """An "Error: ..." message fit to show a student instead of a raw upstream reply"""
+    if isinstance(error, RateLimitExceeded):
+        return "Error: The tutor is handling a lot of requests right now. Please try again in a minute."
+    if isinstance(error, LLMError):
+        if error.status_code in (401, 403):
+            return "Error: The API key was rejected. Please check it in the Configuration section."
+        if error.status_code == 429:
+            return "Error: The AI service is rate limiting us. Please try again in a minute."
+        if error.status_code >= 500:
+            return "Error: The AI service is having trouble right now. Please try again shortly."
+        return f"Error: {error.status_code} - {error.text[:300]}"
+    if isinstance(error, requests.Timeout):
+        return "Error: The AI service took too long to answer. Please try again."
+    if isinstance(error, requests.ConnectionError):
+        return "Error: Could not reach the AI service. Please check the connection and try again."
+    return f"Error: {str(error)}"
+
+
+def chat_completion(api_key: str, messages: List[Dict], model: str = DEFAULT_MODEL,
+                    url: str = OPENROUTER_URL, retries: Optional[int] = None) -> str:
+    """Blocking chat completion over the pooled session
+
+    ``retries`` overrides ``LEARNER_MAX_RETRIES``, e.g. when a router can fail over instead.
+    """
+    cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(model, messages)
+        if cached is not None:
+            report_cached(messages)
+            return cached
+    headers, body = _request_parts(api_key, messages, model)
+    response = _post(url, headers, body, retries=retries)
+    if response.status_code != 200:
+        raise LLMError(response.status_code, response.text)
+    # OpenRouter returns choices[0].message.content
+    with span("json_decode"):
+        data = response.json()
+    content = data["choices"][0]["message"]["content"]
+    report_usage(messages, data.get("usage"))
+    if cache is not None:
+        cache.put(model, messages, content)
+    return content
+
+
+def stream_chat_completion(api_key: str, messages: List[Dict], model: str = DEFAULT_MODEL,
+                           url: str = OPENROUTER_URL, retries: Optional[int] = None) -> Iterator[str]:
+    """Yield completion tokens as the server streams them"""
+    cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(model, messages)
+        if cached is not None:
+            report_cached(messages)
+            yield cached
+            return
+    headers, body = _request_parts(api_key, messages, model, stream=True)
+    parts = []
+    with _post(url, headers, body, stream=True, retries=retries) as response:
+        if response.status_code != 200:
+            raise LLMError(response.status_code, response.text)
+        for token in iter_sse_content(response, lambda usage: report_usage(messages, usage)):
+            parts.append(token)
+            yield token
+    # Only complete streams are cached
+    if cache is not None:
+        cache.put(model, messages, "".join(parts))
+
+
+async def chat_completion_async(api_key: str, messages: List[Dict], model: str = DEFAULT_MODEL,
+                                url: str = OPENROUTER_URL,
+                                complete: Optional[Callable[[str, List[Dict]], str]] = None) -> str:
+    """Awaitable chat completion; the pooled blocking call runs in a worker thread
+
+    ``complete(api_key, messages)`` replaces the direct call, e.g. with a router.
+    """
+    loop = asyncio.get_running_loop()
+    if complete is not None:
+        return await loop.run_in_executor(_async_executor, complete, api_key, messages)
+    return await loop.run_in_executor(_async_executor, chat_completion, api_key, messages, model, url)
+
+
+async def batch_completions(api_key: str, batch: List[List[Dict]], concurrency: int = ASYNC_CONCURRENCY,
+                            model: str = DEFAULT_MODEL, url: str = OPENROUTER_URL,
+                            complete: Optional[Callable[[str, List[Dict]], str]] = None) -> List[str]:
+    """Run several conversations concurrently and return the replies in order
+
+    A failed item yields an ``"Error: ..."`` string rather than failing the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(messages: List[Dict]) -> str:
+        async with semaphore:
+            try:
+                return await chat_completion_async(api_key, messages, model, url, complete)
+            except Exception as e:
+                return friendly_error(e)
+
+    return list(await asyncio.gather(*(one(messages) for messages in batch)))
+
+
+def run_batch(api_key: str, batch: List[List[Dict]], concurrency: int = ASYNC_CONCURRENCY,
+              complete: Optional[Callable[[str, List[Dict]], str]] = None) -> List[str]:
+    """Blocking wrapper around :func:`batch_completions` for script code"""
+    return asyncio.run(batch_completions(api_key, batch, concurrency, complete=complete))
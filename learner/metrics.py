@@ -0,0 +1,146 @@
+"""Lightweight per-stage latency instrumentation.
+
+Code wraps the stages of a chat turn in :func:`span` (file extraction,
+prompt assembly, the LLM call, the HTTP round trip, JSON decoding, the
+transcript render).  Each stage gets a histogram shared by every session in
+the process, exported in the Prometheus text format or as per-span JSON
+lines, and percentiles for the app's performance panel.
+
+``LEARNER_METRICS=0`` turns spans into no-ops; ``LEARNER_METRICS_JSONL``
+names a file that every finished span is appended to, and
+``LEARNER_METRICS_PANEL=1`` adds a "Performance" expander to the apps.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+METRICS = os.environ.get("LEARNER_METRICS", "1") == "1"
+METRICS_JSONL = os.environ.get("LEARNER_METRICS_JSONL", "")
+# Shows the per-stage latency panel in the apps
+METRICS_PANEL = os.environ.get("LEARNER_METRICS_PANEL", "0") == "1"
+# Upper bounds in seconds, Prometheus style; the last bucket is +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Recent samples kept per stage for percentiles
+RESERVOIR = int(os.environ.get("LEARNER_METRICS_RESERVOIR", "1000"))
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples"""
+
+    def __init__(self, buckets=BUCKETS, reservoir: int = RESERVOIR):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=reservoir)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            self._recent.append(seconds)
+
+    def percentiles(self, points=(50, 95, 99)) -> Dict[str, Optional[float]]:
+        """Recent percentiles in milliseconds"""
+        with self._lock:
+            ordered = sorted(self._recent)
+        if not ordered:
+            return {f"p{p}": None for p in points}
+        return {
+            f"p{p}": round(ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)] * 1000, 2)
+            for p in points
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_lock = threading.Lock()
+_jsonl = None
+
+
+def histogram(stage: str) -> Histogram:
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(stage, Histogram())
+    return hist
+
+
+def _write_jsonl(stage: str, seconds: float, error: bool):
+    global _jsonl
+    line = json.dumps({"ts": round(time.time(), 3), "stage": stage,
+                       "ms": round(seconds * 1000, 3), "error": error})
+    with _lock:
+        if _jsonl is None:
+            _jsonl = open(METRICS_JSONL, "a", encoding="utf-8", buffering=1)
+        _jsonl.write(line + "\n")
+
+
+def observe(stage: str, seconds: float, error: bool = False):
+    """Record one measurement of ``stage`` taken elsewhere"""
+    if not METRICS:
+        return
+    histogram(stage).observe(seconds)
+    if METRICS_JSONL:
+        _write_jsonl(stage, seconds, error)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one sample of ``stage``"""
+    if not METRICS:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, error)
+
+
+def stage_stats() -> List[Dict]:
+    """Count, mean and recent p50/p95/p99 (ms) of every stage seen so far"""
+    with _lock:
+        stages = sorted(_histograms.items())
+    return [
+        {"stage": stage, "count": hist.count,
+         "mean": round(hist.sum / hist.count * 1000, 2) if hist.count else None,
+         **hist.percentiles()}
+        for stage, hist in stages
+    ]
+
+
+def prometheus_text() -> str:
+    """All stage histograms in the Prometheus text exposition format"""
+    lines = [
+        "# HELP learner_stage_seconds Time spent in each stage of a chat turn",
+        "# TYPE learner_stage_seconds histogram",
+    ]
+    with _lock:
+        stages = sorted(_histograms.items())
+    for stage, hist in stages:
+        with hist._lock:
+            counts, total, count = list(hist.counts), hist.sum, hist.count
+        cumulative = 0
+        for bound, bucket in zip(list(hist.buckets) + ["+Inf"], counts):
+            cumulative += bucket
+            lines.append(f'learner_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'learner_stage_seconds_sum{{stage="{stage}"}} {total}')
+        lines.append(f'learner_stage_seconds_count{{stage="{stage}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """Forget every histogram (e.g. between benchmark runs)"""
+    with _lock:
+        _histograms.clear()
@@ -0,0 +1,101 @@
+"""Prompt assembly for the tutor.
+
+The tutor instruction is sent once, as the first (system) message, instead
+of being prepended to every user turn.  With ``cache_prefix`` the
+instruction is marked cacheable and always serialized byte-for-byte the
+same, so providers with prompt caching can reuse the prefix across turns.
+
+Models that reject the system role get every system message (instruction,
+summary, syllabus excerpts) folded into the first user turn when the request
+is sent; see :func:`for_model`.  Folding flattens content parts to text, so
+prompt caching has no effect for those models.
+"""
+import os
+from typing import Callable, Dict, List, Optional
+
+from .context import estimate_tokens
+
+TUTOR_INSTRUCTION = "You are a helpful tutor. You are to keep track of the 'Concept' we cover from the syllabus. End Each message with" \
+    "'Current Concept:[whatever 'Concept' we are currently on in the syllabus] and with every  New syllabus always ask where would you like that start your learning?"
+
+# Some providers reject system messages (Google AI Studio, which serves the
+# Gemma models, among them); requests to these models have them folded into
+# the first user turn.  LEARNER_SYSTEM_ROLE=1 or 0 decides for every model.
+SYSTEM_ROLE = os.environ.get("LEARNER_SYSTEM_ROLE", "auto")
+NO_SYSTEM_ROLE_MODELS = ("google/gemma-",)
+PROMPT_CACHING = os.environ.get("LEARNER_PROMPT_CACHING", "0") == "1"
+
+# Separator the old per-turn prepending used
+_LEGACY_SEPARATOR = "\n\n"
+
+
+def measure_savings(history: List[Dict[str, str]], instruction: str) -> Dict[str, int]:
+    """Bytes and tokens saved versus prepending the instruction to every user turn"""
+    user_turns = sum(1 for m in history if m["role"] == "user")
+    per_turn = instruction + _LEGACY_SEPARATOR
+    legacy_bytes = user_turns * len(per_turn.encode("utf-8"))
+    legacy_tokens = user_turns * estimate_tokens(per_turn)
+    sent_bytes = len(instruction.encode("utf-8"))
+    sent_tokens = estimate_tokens(instruction)
+    return {
+        "user_turns": user_turns,
+        "bytes_saved": legacy_bytes - sent_bytes,
+        "tokens_saved": legacy_tokens - sent_tokens,
+    }
+
+
+def _text(content) -> str:
+    """Plain text of a message's content, whether a string or content parts"""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content)
+
+
+def supports_system_role(model: str) -> bool:
+    """Whether requests to ``model`` may carry system messages"""
+    if SYSTEM_ROLE in ("0", "1"):
+        return SYSTEM_ROLE == "1"
+    return not model.startswith(NO_SYSTEM_ROLE_MODELS)
+
+
+def _fold_system(messages: List[Dict]) -> List[Dict]:
+    """Move system messages into the first user turn for providers without a system role
+
+    Content parts become plain text, so ``cache_control`` markers are dropped.
+    """
+    system = [_text(m["content"]) for m in messages if m["role"] == "system"]
+    rest = [m for m in messages if m["role"] != "system"]
+    if not system:
+        return rest
+    for i, msg in enumerate(rest):
+        if msg["role"] == "user":
+            rest[i] = {"role": "user", "content": "\n\n".join(system + [_text(msg["content"])])}
+            return rest
+    return [{"role": "user", "content": "\n\n".join(system)}] + rest
+
+
+def build_messages(history: List[Dict[str, str]],
+                   instruction: str = TUTOR_INSTRUCTION,
+                   cache_prefix: bool = PROMPT_CACHING,
+                   measure: Optional[Callable[[Dict[str, int]], None]] = None) -> List[Dict]:
+    """Assemble the request: instruction once up front, then context and turns"""
+    if cache_prefix:
+        # Content parts with a cache breakpoint; the instruction is a constant so
+        # the serialized prefix is identical on every request
+        head = {"role": "system", "content": [
+            {"type": "text", "text": instruction, "cache_control": {"type": "ephemeral"}}
+        ]}
+    else:
+        head = {"role": "system", "content": instruction}
+    # Summaries and other system context follow the stable instruction prefix
+    context = [m for m in history if m["role"] == "system"]
+    turns = [m for m in history if m["role"] != "system"]
+    messages = [head] + [{"role": m["role"], "content": m["content"]} for m in context + turns]
+    if measure is not None:
+        measure(measure_savings(turns, instruction))
+    return messages
+
+
+def for_model(messages: List[Dict], model: str) -> List[Dict]:
+    """``messages`` in the form ``model`` accepts"""
+    return messages if supports_system_role(model) else _fold_system(messages)
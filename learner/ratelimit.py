@@ -0,0 +1,77 @@
+"""Client-side token-bucket rate limiting shared by every session in the process.
+
+Provider limits (OpenRouter's 20 requests per minute on free models) apply
+per API key, so there is one bucket per upstream host and key: each
+student's own requests are paced to their key's limit, and sessions that
+share a key (e.g. a backend's own ``api_key_env``) share its bucket.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# OpenRouter's free models allow 20 requests per minute
+RATE_LIMIT_RPM = float(os.environ.get("LEARNER_RATE_LIMIT_RPM", "20"))
+RATE_LIMIT_BURST = float(os.environ.get("LEARNER_RATE_LIMIT_BURST", "5"))
+# Longest a request waits for a token before giving up
+RATE_LIMIT_MAX_WAIT = float(os.environ.get("LEARNER_RATE_LIMIT_MAX_WAIT", "30"))
+# Buckets kept, least recently used dropped first
+RATE_LIMIT_KEYS = 4096
+
+
+class RateLimitExceeded(Exception):
+    """No request token became available within the allowed wait"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilling at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt; returns how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        """Block until a token is available, or raise RateLimitExceeded"""
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait > max_wait:
+            # Give the reservation back so queued callers are not delayed by it
+            with self._lock:
+                self._tokens += 1
+            raise RateLimitExceeded(f"request rate limit reached; next slot in {wait:.0f}s")
+        if wait > 0:
+            time.sleep(wait)
+
+
+_buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+_buckets_lock = threading.Lock()
+
+
+def limiter_for(url: str, api_key: str = "") -> TokenBucket:
+    """The shared bucket for ``api_key`` on the host serving ``url``"""
+    # Only a digest of the key is held on to
+    key = (urlsplit(url).netloc, hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16])
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(RATE_LIMIT_RPM / 60.0, RATE_LIMIT_BURST)
+            while len(_buckets) > RATE_LIMIT_KEYS:
+                _buckets.popitem(last=False)
+        else:
+            _buckets.move_to_end(key)
+    return bucket
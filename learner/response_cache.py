@@ -0,0 +1,160 @@
+"""Opt-in cache of LLM replies for repeated prompts.
+
+Replies are keyed by the model id and the normalized message list, expire
+after a TTL and are evicted least-recently-used beyond a size bound.  The
+store is pluggable: in-process memory or an SQLite file on local disk.
+
+Enable with ``LEARNER_RESPONSE_CACHE=memory`` or
+``LEARNER_RESPONSE_CACHE=sqlite:/path/to/cache.db``.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+RESPONSE_CACHE = os.environ.get("LEARNER_RESPONSE_CACHE", "")
+RESPONSE_CACHE_TTL = float(os.environ.get("LEARNER_RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("LEARNER_RESPONSE_CACHE_SIZE", "1000"))
+
+
+def _normalize(content) -> str:
+    if not isinstance(content, str):
+        content = "".join(part.get("text", "") for part in content)
+    return " ".join(content.split())
+
+
+def cache_key(model: str, messages: List[Dict]) -> str:
+    """Stable key for a request, insensitive to whitespace differences"""
+    normalized = [[m["role"], _normalize(m["content"])] for m in messages]
+    raw = json.dumps([model, normalized], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """LRU dict of ``key -> (expires_at, reply)``"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: float, max_entries: int):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Same contract as :class:`MemoryBackend`, persisted in an SQLite file"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: float, max_entries: int):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (max_entries,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL- and size-bounded reply cache with hit/miss counters"""
+
+    def __init__(self, backend, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, model: str, messages: List[Dict]) -> Optional[str]:
+        value = self.backend.get(cache_key(model, messages))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, model: str, messages: List[Dict], value: str):
+        self.backend.set(cache_key(model, messages), value, self.ttl, self.max_entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.backend), "hits": self.hits, "misses": self.misses}
+
+
+def cache_from_spec(spec: str) -> Optional[ResponseCache]:
+    """Build a cache from ``memory`` or ``sqlite:<path>``; empty disables caching"""
+    if not spec:
+        return None
+    if spec == "memory":
+        return ResponseCache(MemoryBackend())
+    if spec.startswith("sqlite:"):
+        return ResponseCache(SQLiteBackend(spec[len("sqlite:"):] or "response_cache.db"))
+    raise ValueError(f"Unknown response cache backend: {spec}")
+
+
+_response_cache = cache_from_spec(RESPONSE_CACHE)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide reply cache, or None when caching is off"""
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """Install (or with None, disable) the process-wide reply cache"""
+    global _response_cache
+    _response_cache = cache
@@ -0,0 +1,148 @@
+"""In-process BM25 retrieval over an attached syllabus.
+
+The extracted text is split into overlapping chunks and indexed once per
+distinct upload.  Each turn then sends only the few chunks relevant to the
+question and the current concept instead of a fixed 3000-character prefix.
+"""
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+CHUNK_CHARS = int(os.environ.get("LEARNER_CHUNK_CHARS", "800"))
+CHUNK_OVERLAP = int(os.environ.get("LEARNER_CHUNK_OVERLAP", "100"))
+TOP_K = int(os.environ.get("LEARNER_RETRIEVAL_TOP_K", "4"))
+# Number of syllabus indexes kept in memory
+INDEX_CACHE_SIZE = int(os.environ.get("LEARNER_INDEX_CACHE_SIZE", "32"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with what which who how why when where me my i you "
+    "your we our us do does can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping chunks, preferring line breaks as boundaries"""
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            # Back up to the last line break in the second half of the chunk
+            cut = text.rfind("\n", start + chunk_chars // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        next_start = max(end - overlap, start + 1)
+        # Begin the overlap on a fresh line when there is one
+        line = text.find("\n", next_start, end)
+        start = line + 1 if line != -1 else next_start
+    return chunks
+
+
+class SyllabusIndex:
+    """BM25 inverted index with postings stored as flat NumPy arrays"""
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        # Imported here so sessions without a syllabus never load NumPy
+        import numpy as np
+
+        self.chunks = chunks
+        self.vocab: Dict[str, int] = {}
+        docs, terms, freqs = [], [], []
+        doc_len = np.zeros(len(chunks))
+        for doc, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                docs.append(doc)
+                terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                freqs.append(tf)
+
+        terms = np.asarray(terms, dtype=np.int64)
+        # Group postings by term so each term's postings are one contiguous slice
+        order = np.argsort(terms, kind="stable")
+        self._docs = np.asarray(docs, dtype=np.int64)[order]
+        tf = np.asarray(freqs, dtype=np.float64)[order]
+        df = np.bincount(terms, minlength=len(self.vocab))
+        self._offsets = np.concatenate(([0], np.cumsum(df)))
+
+        n = len(chunks)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = doc_len.mean() if n else 0.0
+        norm = k1 * (1 - b + b * doc_len / (avgdl or 1.0))
+        # Query-independent BM25 weight of every posting, so a search is just
+        # a gather and a scatter-add
+        self._weights = idf[terms[order]] * tf * (k1 + 1) / (tf + norm[self._docs])
+
+    def search(self, query: str, k: int = TOP_K) -> List[Tuple[int, float]]:
+        """Indexes and scores of the ``k`` best-matching chunks"""
+        import numpy as np
+
+        ids = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not ids or not self.chunks:
+            return []
+        postings = np.concatenate([np.arange(self._offsets[i], self._offsets[i + 1]) for i in ids])
+        scores = np.bincount(self._docs[postings], weights=self._weights[postings],
+                             minlength=len(self.chunks))
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def top_chunks(self, query: str, k: int = TOP_K) -> List[str]:
+        """The best-matching chunks in document order, or the opening chunks
+        when nothing in the query matches"""
+        hits = self.search(query, k)
+        if not hits:
+            return self.chunks[:k]
+        return [self.chunks[i] for i in sorted(i for i, _ in hits)]
+
+
+_indexes: "OrderedDict[str, SyllabusIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def cached_index(key: str) -> Optional[SyllabusIndex]:
+    """The shared index for a content key, if one has been built"""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+        return index
+
+
+def put_index(key: str, index: SyllabusIndex):
+    """Share an index built elsewhere (e.g. by a background ingestion job)"""
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+
+
+def get_index(key: str, text: str) -> SyllabusIndex:
+    """Shared index for a syllabus, built once per content key"""
+    index = cached_index(key)
+    if index is None:
+        index = SyllabusIndex(chunk_text(text))
+        put_index(key, index)
+    return index
+
+
+def format_excerpts(chunks: List[str]) -> str:
+    """System message content carrying the retrieved syllabus chunks"""
+    body = "\n\n---\n\n".join(chunks)
+    return f"Relevant excerpts from the attached syllabus:\n\n{body}"
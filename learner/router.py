@@ -0,0 +1,296 @@
+"""Latency-aware routing across several OpenAI-compatible backends.
+
+Each backend keeps an exponentially weighted moving average (EWMA) of its
+latency and error rate.  Requests go to the fastest healthy backend; if it
+has not answered by its own p95 (configurable) latency, the request is
+hedged to the next-best backend and the first reply wins.  Backends that
+fail with a network error, a timeout, a rate limit or a server error are
+skipped in favour of the next one; client errors (a bad request or key) are
+raised at once.
+
+Backends come from ``LEARNER_BACKENDS``, a JSON list such as::
+
+    [{"name": "openrouter", "url": "https://openrouter.ai/api/v1/chat/completions",
+      "model": "google/gemma-3n-e4b-it:free"},
+     {"name": "local", "url": "http://127.0.0.1:8001/v1/chat/completions",
+      "model": "gemma3", "api_key_env": "LOCAL_LLM_KEY"}]
+
+Without it the router has the single OpenRouter backend the app always used.
+An entry's ``kind`` picks its implementation: ``openai`` (the default, any
+OpenAI-compatible URL) or a kind added with :func:`register_backend`, such
+as the in-process ``stub`` from :mod:`learner.stub_llm`.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+from .llm_client import (DEFAULT_MODEL, MAX_RETRIES, OPENROUTER_URL, LLMError, chat_completion,
+                         stream_chat_completion)
+
+BACKENDS = os.environ.get("LEARNER_BACKENDS", "")
+EWMA_ALPHA = float(os.environ.get("LEARNER_ROUTER_ALPHA", "0.2"))
+# Backends whose EWMA error rate is above this are avoided
+MAX_ERROR_RATE = float(os.environ.get("LEARNER_ROUTER_MAX_ERROR_RATE", "0.5"))
+# Seconds before an unhealthy backend gets another chance
+UNHEALTHY_COOLDOWN = float(os.environ.get("LEARNER_ROUTER_COOLDOWN", "30"))
+HEDGE_PERCENTILE = float(os.environ.get("LEARNER_HEDGE_PERCENTILE", "95"))
+# Latency samples a backend needs before its percentile is trusted for hedging
+HEDGE_MIN_SAMPLES = int(os.environ.get("LEARNER_HEDGE_MIN_SAMPLES", "20"))
+# Retries inside one backend when another can take over; failing over is
+# quicker than backing off against a backend that is down or rate limiting
+FAILOVER_RETRIES = int(os.environ.get("LEARNER_ROUTER_FAILOVER_RETRIES", "0"))
+# Threads making blocking backend calls, shared by every request in the
+# process; each call and each hedge holds one until its backend answers, and
+# calls beyond it wait for a free thread
+ROUTER_WORKERS = int(os.environ.get("LEARNER_ROUTER_WORKERS", "32"))
+
+
+def _is_backend_fault(error: Exception) -> bool:
+    """Rate limits, server errors and network failures count against a backend"""
+    if isinstance(error, LLMError):
+        return error.status_code == 429 or error.status_code >= 500
+    # The client-side limiter (RateLimitExceeded) says nothing about the backend
+    return isinstance(error, (requests.RequestException, OSError))
+
+
+class Backend:
+    """One OpenAI-compatible endpoint and model, with its health statistics
+
+    Other kinds of backend subclass this and override :meth:`complete` and
+    :meth:`stream`; the router only ever calls those two.
+    """
+
+    def __init__(self, name: str, url: str, model: str, api_key: Optional[str] = None,
+                 api_key_env: Optional[str] = None):
+        self.name = name
+        self.url = url
+        self.model = model
+        # Own credentials, or None to use the key the user entered
+        self.api_key = api_key or (os.environ.get(api_key_env) if api_key_env else None)
+        # Retries on 429/5xx and network errors; None uses LEARNER_MAX_RETRIES
+        self.retries: Optional[int] = None
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_failure = 0.0
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def complete(self, api_key: str, messages: List[Dict]) -> str:
+        return chat_completion(self.api_key or api_key, messages, self.model, self.url, self.retries)
+
+    def stream(self, api_key: str, messages: List[Dict]) -> Iterator[str]:
+        return stream_chat_completion(self.api_key or api_key, messages, self.model, self.url, self.retries)
+
+    def record(self, latency: Optional[float], failed: bool, alpha: float = EWMA_ALPHA):
+        with self._lock:
+            self.requests += 1
+            self.ewma_error = alpha * (1.0 if failed else 0.0) + (1 - alpha) * self.ewma_error
+            if failed:
+                self.failures += 1
+                self.last_failure = time.time()
+            elif latency is not None:
+                self._latencies.append(latency)
+                if self.ewma_latency is None:
+                    self.ewma_latency = latency
+                else:
+                    self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def healthy(self) -> bool:
+        return (self.ewma_error <= MAX_ERROR_RATE
+                or time.time() - self.last_failure > UNHEALTHY_COOLDOWN)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "healthy": self.healthy(),
+            "ewma_latency_ms": None if self.ewma_latency is None else round(self.ewma_latency * 1000, 1),
+            "ewma_error_rate": round(self.ewma_error, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class Router:
+    """Routes chat completions to the fastest healthy backend, with hedging and failover"""
+
+    def __init__(self, backends: List[Backend], hedge_percentile: Optional[float] = HEDGE_PERCENTILE,
+                 max_workers: int = ROUTER_WORKERS):
+        if not backends:
+            raise ValueError("Router needs at least one backend")
+        self.backends = backends
+        if len(backends) > 1:
+            for backend in backends:
+                if backend.retries is None:
+                    backend.retries = min(MAX_RETRIES, FAILOVER_RETRIES)
+        self.hedge_percentile = hedge_percentile
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="learner-router")
+
+    @property
+    def model(self) -> str:
+        """Identity of the models this router may answer with"""
+        return "|".join(b.model for b in self.backends)
+
+    def ranked(self) -> List[Backend]:
+        """Healthy backends first, fastest first; unmeasured ones are tried early"""
+        return sorted(self.backends, key=lambda b: (
+            not b.healthy(),
+            b.ewma_latency if b.ewma_latency is not None else 0.0,
+        ))
+
+    def _call(self, backend: Backend, api_key: str, messages: List[Dict]) -> str:
+        start = time.perf_counter()
+        try:
+            reply = backend.complete(api_key, messages)
+        except Exception as e:
+            backend.record(None, _is_backend_fault(e))
+            raise
+        backend.record(time.perf_counter() - start, False)
+        return reply
+
+    def complete(self, api_key: str, messages: List[Dict]) -> str:
+        """Blocking completion from the best available backend"""
+        candidates = self.ranked()
+        pending = {}
+        last_error: Optional[Exception] = None
+        next_index = 0
+        hedging = False
+
+        def launch():
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            pending[self._executor.submit(self._call, backend, api_key, messages)] = backend
+
+        launch()
+        while pending:
+            hedge_after = None
+            if self.hedge_percentile is not None and next_index < len(candidates) and len(pending) == 1:
+                primary = next(iter(pending.values()))
+                hedge_after = primary.latency_percentile(self.hedge_percentile)
+            done, _ = wait(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                # The primary is slower than usual: race the next backend against it
+                self.hedged += 1
+                hedging = True
+                launch()
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    reply = future.result()
+                except Exception as e:
+                    if not _is_backend_fault(e):
+                        # A bad request or key fails the same way everywhere
+                        raise
+                    last_error = e
+                    continue
+                if hedging and backend is not candidates[0]:
+                    self.hedge_wins += 1
+                # Any slower request still running finishes in the background
+                return reply
+            if not pending and next_index < len(candidates):
+                # Fail over to the next backend
+                launch()
+        raise last_error
+
+    def stream(self, api_key: str, messages: List[Dict]) -> Iterator[str]:
+        """Stream from the best backend, failing over until the first token arrives"""
+        last_error: Optional[Exception] = None
+        for backend in self.ranked():
+            start = time.perf_counter()
+            started = False
+            try:
+                for token in backend.stream(api_key, messages):
+                    if not started:
+                        started = True
+                        # Time to first token is what a streaming caller waits for
+                        backend.record(time.perf_counter() - start, False)
+                    yield token
+                return
+            except Exception as e:
+                backend.record(None, _is_backend_fault(e))
+                if started or not _is_backend_fault(e):
+                    raise
+                last_error = e
+        raise last_error
+
+    def stats(self) -> Dict:
+        return {
+            "backends": [b.stats() for b in self.backends],
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def _openai_backend(entry: Dict) -> Backend:
+    return Backend(entry.get("name", entry["url"]), entry["url"], entry.get("model", DEFAULT_MODEL),
+                   entry.get("api_key"), entry.get("api_key_env"))
+
+
+def _stub_backend(entry: Dict) -> Backend:
+    # The stub is for tests and benchmarks; the app never imports it otherwise
+    from .stub_llm import stub_backend
+    return stub_backend(entry)
+
+
+_backend_kinds: Dict[str, Callable[[Dict], Backend]] = {
+    "openai": _openai_backend,
+    "stub": _stub_backend,
+}
+
+
+def register_backend(kind: str, factory: Callable[[Dict], Backend]):
+    """Add or replace the factory building backends of ``kind`` from their spec entry"""
+    _backend_kinds[kind] = factory
+
+
+def backends_from_spec(spec: str) -> List[Backend]:
+    """Backends from a ``LEARNER_BACKENDS`` JSON list; OpenRouter when empty"""
+    if not spec:
+        return [Backend("openrouter", OPENROUTER_URL, DEFAULT_MODEL)]
+    backends = []
+    for entry in json.loads(spec):
+        kind = entry.get("kind", "openai")
+        if kind not in _backend_kinds:
+            raise ValueError(f"Unknown backend kind: {kind}")
+        backends.append(_backend_kinds[kind](entry))
+    return backends
+
+
+_router: Optional[Router] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> Router:
+    """The process-wide router, built from ``LEARNER_BACKENDS`` on first use"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = Router(backends_from_spec(BACKENDS))
+    return _router
+
+
+def set_router(router: Router):
+    """Install a router (e.g. one pointing at local stub servers)"""
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,334 @@
+"""The tutor engine as one long-lived, thread-safe service object.
+
+Prompt assembly, model calls, syllabus extraction and concept tracking used
+to run inline in each session's script, re-wired on every rerun.
+:class:`TutorService` does that work behind one API, and keeps everything
+that can be shared in one place: the pooled client behind the router,
+request coalescing, the syllabus text and index caches, the token ledger and
+the session store.  Each conversation's derived state (the rolling summary
+and the concept timeline) is kept here too, keyed by session id.  It
+survives reruns and browser reloads instead of living in every session's
+``st.session_state``.
+
+Streamlit apps create the service once per process with
+``st.cache_resource``; other front ends create their own.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from .coalesce import get_single_flight, request_key
+from .concepts import ConceptTimeline, current_concept
+from .context import build_context, fold_turns, new_context_state, summary_due, summary_request
+from .extraction import extraction_cache_stats
+from .ingest import INGEST_WAIT, IngestJob, get_ingest_queue
+from .llm_client import LLMError, connection_stats, friendly_error, run_batch
+from .metrics import observe, span
+from .prompts import PROMPT_CACHING, TUTOR_INSTRUCTION, build_messages
+from .ratelimit import RateLimitExceeded
+from .response_cache import get_response_cache
+from .retrieval import format_excerpts
+from .router import Router, get_router
+from .session_store import get_session_store
+from .usage import TokenBudgetExceeded, get_ledger
+
+# Conversations whose derived state is kept, least recently used dropped first
+SERVICE_CONVERSATIONS = int(os.environ.get("LEARNER_SERVICE_CONVERSATIONS", "1000"))
+
+_EXPECTED_ERRORS = (LLMError, RateLimitExceeded, TokenBudgetExceeded, requests.RequestException)
+
+
+class Upload(NamedTuple):
+    """An uploaded file, shaped like Streamlit's ``UploadedFile``"""
+    data: bytes
+    type: str
+    name: str
+
+    def getvalue(self) -> bytes:
+        return self.data
+
+
+class Conversation:
+    """Derived state of one chat: its rolling summary and concept timeline"""
+
+    def __init__(self):
+        self.context_state = new_context_state()
+        self.timeline = ConceptTimeline()
+        # Held here for front ends without a session state of their own (the
+        # HTTP API); the Streamlit apps keep these in st.session_state
+        self.messages: Optional[List[Dict[str, str]]] = None
+        self.upload: Optional[Upload] = None
+        # The most recent attach, which replaces ``upload`` only if it succeeds
+        self.ingest_job: Optional[IngestJob] = None
+        self.attach_count = 0
+        self.attached_count = 0
+        # A session's reruns can overlap; guards the conversation's state, and
+        # is never held across a model call
+        self.lock = threading.RLock()
+
+
+class TutorService:
+    """Thread-safe tutor engine shared by every session in the process"""
+
+    def __init__(self, max_conversations: int = SERVICE_CONVERSATIONS):
+        self.max_conversations = max_conversations
+        self.ledger = get_ledger()
+        self.single_flight = get_single_flight()
+        self.ingest_queue = get_ingest_queue()
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def router(self) -> Router:
+        # Looked up per call, so set_router() also reaches a running service
+        return get_router()
+
+    def conversation(self, session_id: str) -> Conversation:
+        with self._lock:
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                conversation = self._conversations[session_id] = Conversation()
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            self._conversations.move_to_end(session_id)
+            return conversation
+
+    # Chat history
+
+    def load_messages(self, session_id: str) -> List[Dict[str, str]]:
+        """A session's history from the session store (empty without one)"""
+        store = get_session_store()
+        return store.load(session_id) if store else []
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """The session's history, kept by the service
+
+        Loaded from the store on first use and not re-read after, so messages
+        another process adds to the same session are not seen here.
+        """
+        conversation = self.conversation(session_id)
+        with conversation.lock:
+            if conversation.messages is None:
+                conversation.messages = self.load_messages(session_id)
+            return conversation.messages
+
+    def add_message(self, session_id: str, messages: List[Dict[str, str]], role: str, content: str) -> Dict:
+        """Append a message to ``messages`` and to the session store"""
+        message = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().strftime("%H:%M:%S")
+        }
+        messages.append(message)
+        # Buffered; written to disk in batches off the request path
+        store = get_session_store()
+        if store:
+            store.append(session_id, message)
+        return message
+
+    def clear(self, session_id: str):
+        """Forget a session's history and derived state"""
+        store = get_session_store()
+        if store:
+            store.clear(session_id)
+        with self._lock:
+            self._conversations.pop(session_id, None)
+
+    # Model calls; failures come back as "Error: ..." text fit for the student
+
+    def complete(self, api_key: str, session_id: str, messages: List[Dict], tool: str = "Chat") -> str:
+        """Blocking reply; ``tool`` is what the tokens are booked to"""
+        try:
+            # Refused before it is sent, so a runaway session stops spending
+            self.ledger.check_budget(session_id, messages)
+            router = self.router
+            # Fastest healthy backend, over the pooled keep-alive session; identical
+            # requests already in flight from other sessions share that call
+            with span("llm"):
+                reply, shared = self.single_flight.flight(request_key(router.model, messages),
+                                                          lambda: router.complete(api_key, messages))
+        except _EXPECTED_ERRORS as e:
+            return friendly_error(e)
+        self.ledger.record(session_id, tool, messages, reply, coalesced=shared)
+        return reply
+
+    def stream(self, api_key: str, session_id: str, messages: List[Dict], tool: str = "Chat") -> Iterator[str]:
+        """Reply tokens as they arrive"""
+        started = False
+        parts = []
+        try:
+            self.ledger.check_budget(session_id, messages)
+            router = self.router
+            key = request_key(router.model, messages)
+            start = time.perf_counter()
+            # The whole stream, as the student waits for it, includes drawing the tokens
+            tokens = self.single_flight.stream(key, lambda: router.stream(api_key, messages))
+            with span("llm_stream"):
+                for token in tokens:
+                    if not started:
+                        observe("llm_first_token", time.perf_counter() - start)
+                    started = True
+                    parts.append(token)
+                    yield token
+            self.ledger.record(session_id, tool, messages, "".join(parts), coalesced=tokens.shared)
+        except Exception as e:
+            # After a partial reply, keep the error apart from the streamed text
+            yield ("\n\n" if started else "") + friendly_error(e)
+
+    def quiz(self, api_key: str, session_id: str, messages: List[Dict],
+             quiz_types: List[Tuple[str, str]], topic: str) -> str:
+        """Ask for every assessment type at once and assemble the replies in order"""
+        batch = [
+            messages + [{"role": "user", "content": f"{instruction} {topic}"}]
+            for _, instruction in quiz_types
+        ]
+        try:
+            self.ledger.check_budget(session_id, messages, requests=len(batch))
+        except TokenBudgetExceeded as e:
+            return friendly_error(e)
+        # Requests go out concurrently, so this takes about as long as the slowest one
+        router = self.router
+        shared = set()
+        replies = run_batch(api_key, batch,
+                            complete=self.single_flight.coalesced(router.complete, router.model, shared))
+        for item, reply in zip(batch, replies):
+            if not reply.startswith("Error"):
+                self.ledger.record(session_id, "Generate Full Quiz", item, reply, coalesced=id(item) in shared)
+        return "\n\n".join(f"### {label}\n{reply}" for (label, _), reply in zip(quiz_types, replies))
+
+    def summarize(self, api_key: str, session_id: str, previous_summary: str,
+                  turns: List[Dict[str, str]]) -> str:
+        """Fold turns that slid out of the context window into the rolling summary"""
+        summary = self.complete(api_key, session_id, summary_request(previous_summary, turns), tool="Summary")
+        if summary.startswith("Error"):
+            raise RuntimeError(summary)
+        return summary
+
+    def _refresh_summary(self, api_key: str, session_id: str, conversation: Conversation,
+                         upto: int, turns: List[Dict[str, str]]):
+        """Fold ``turns`` into the rolling summary on a background thread"""
+        state = conversation.context_state
+        previous, epoch = state["summary"], state["epoch"]
+
+        def run():
+            summary = fold_turns(previous, turns,
+                                 lambda previous, turns: self.summarize(api_key, session_id, previous, turns))
+            with conversation.lock:
+                if state["epoch"] == epoch:
+                    state.update(summary=summary, summarized_upto=upto, summarizing=False)
+
+        threading.Thread(target=run, name="learner-summary", daemon=True).start()
+
+    # Syllabus
+
+    def ingest(self, upload) -> IngestJob:
+        """Start extracting and indexing an upload in the background; cheap to repeat"""
+        return self.ingest_queue.submit(upload)
+
+    def excerpts(self, upload, question: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Syllabus chunks relevant to the question and the current concept
+
+        None when the file could not be read; the front end shows that error.
+        """
+        job = self.ingest(upload)
+        # Small files are ready within the wait; a large one answers from the
+        # pages read so far while the rest is still being indexed
+        job.wait_ready(INGEST_WAIT)
+        if job.error is not None:
+            return None
+        index = job.index
+        if index is None or not index.chunks:
+            return "The attached syllabus is still being read; no excerpts from it are available yet."
+        query = f"{question} {current_concept(messages) or ''}"
+        return format_excerpts(index.top_chunks(query))
+
+    def attach(self, session_id: str, upload: Upload) -> IngestJob:
+        """Attach a syllabus to a conversation once it has been read
+
+        The file is indexed in the background.  It replaces the attached
+        syllabus only when its job succeeds; until then, and if it fails, the
+        previous one stays attached.
+        """
+        conversation = self.conversation(session_id)
+        job = self.ingest(upload)
+        with conversation.lock:
+            conversation.attach_count += 1
+            attempt = conversation.attach_count
+            conversation.ingest_job = job
+
+        def attached(job: IngestJob):
+            with conversation.lock:
+                # A later upload that finished first is not replaced by this one
+                if job.status == "done" and attempt > conversation.attached_count:
+                    conversation.upload = upload
+                    conversation.attached_count = attempt
+
+        job.on_done(attached)
+        return job
+
+    # Prompt assembly
+
+    def build_request(self, api_key: str, session_id: str, messages: List[Dict[str, str]],
+                      upload=None, question: str = "", instruction: Optional[str] = TUTOR_INSTRUCTION,
+                      cache_prefix: bool = PROMPT_CACHING, measure=None) -> List[Dict]:
+        """The messages to send for the next reply
+
+        The history is kept inside the token budget, with older turns folded
+        into the conversation's rolling summary, which is brought up to date in
+        the background.  Relevant syllabus excerpts
+        are added for an upload.  The tutor instruction goes in once as a
+        system message, or not at all when ``instruction`` is None.
+        """
+        conversation = self.conversation(session_id)
+        with span("prompt"):
+            with conversation.lock:
+                history = build_context(messages, conversation.context_state)
+                due = summary_due(messages, conversation.context_state)
+                if due is not None:
+                    conversation.context_state["summarizing"] = True
+            if due is not None:
+                self._refresh_summary(api_key, session_id, conversation, *due)
+            excerpts = self.excerpts(upload, question, messages) if upload is not None else None
+            if excerpts is not None:
+                history.insert(0, {"role": "system", "content": excerpts})
+            if instruction is None:
+                return history
+            return build_messages(history, instruction, cache_prefix=cache_prefix, measure=measure)
+
+    # Concepts
+
+    def concepts(self, session_id: str, messages: List[Dict[str, str]]) -> ConceptTimeline:
+        """The session's concept timeline, brought up to date with ``messages``"""
+        conversation = self.conversation(session_id)
+        with conversation.lock:
+            conversation.timeline.update(messages)
+        return conversation.timeline
+
+    def navigate(self, session_id: str, messages: List[Dict[str, str]], label: str) -> Optional[str]:
+        """Reply to a navigation tool from the concept timeline, or None if the model must answer"""
+        timeline = self.concepts(session_id, messages)
+        if label == "Concept History":
+            return timeline.history_markdown()
+        previous = timeline.previous()
+        if label == "Previous Concept" and previous:
+            # The trailer keeps the model and the timeline on the concept we went back to
+            return f"Let's go back to **{previous}**.\n\nCurrent Concept:[{previous}]"
+        return None
+
+    def stats(self) -> Dict:
+        """Shared pools and caches, for the apps' configuration panel"""
+        response_cache = get_response_cache()
+        return {
+            "connections": connection_stats(),
+            "syllabus_cache": extraction_cache_stats(),
+            "routing": self.router.stats(),
+            "coalescing": self.single_flight.stats(),
+            "response_cache": response_cache.stats() if response_cache is not None else None,
+            "ingestion": self.ingest_queue.stats(),
+            "conversations": len(self._conversations),
+        }
@@ -0,0 +1,192 @@
+"""Persistent chat sessions with write-behind batching.
+
+Every ``add_message``/``clear_chat`` becomes an append-only event.  The chat
+hot path only appends the event to an in-memory buffer; a background thread
+writes buffered events to the backend in batches.  A session's history is
+rebuilt from its events the first time it is accessed after a restart.
+
+The default backend is SQLite (``LEARNER_SESSION_STORE=sqlite:<path>``);
+anything with ``write_batch`` and ``load`` can replace it.
+"""
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+SESSION_STORE = os.environ.get("LEARNER_SESSION_STORE", "sqlite:learner_sessions.db")
+FLUSH_INTERVAL = float(os.environ.get("LEARNER_SESSION_FLUSH_SECONDS", "1.0"))
+FLUSH_BATCH = int(os.environ.get("LEARNER_SESSION_FLUSH_BATCH", "256"))
+# Browser cookie holding the chat session id, and how long it lasts
+SESSION_COOKIE = "learner_sid"
+SESSION_COOKIE_DAYS = int(os.environ.get("LEARNER_SESSION_COOKIE_DAYS", "30"))
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+# (session_id, kind, role, content, timestamp); kind is "message" or "clear"
+Event = Tuple[str, str, str, str, str]
+
+
+class SQLiteSessionBackend:
+    """Append-only event log in an SQLite file"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "kind TEXT NOT NULL, role TEXT, content TEXT, timestamp TEXT, "
+                "created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS session_events_session ON session_events (session_id, id)"
+            )
+
+    def write_batch(self, events: List[Event]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO session_events (session_id, kind, role, content, timestamp, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [event + (now,) for event in events]
+            )
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            # Only events after the most recent clear matter
+            rows = self._conn.execute(
+                "SELECT role, content, timestamp FROM session_events "
+                "WHERE session_id = ? AND kind = 'message' AND id > COALESCE(("
+                "SELECT MAX(id) FROM session_events WHERE session_id = ? AND kind = 'clear'), 0) "
+                "ORDER BY id", (session_id, session_id)
+            ).fetchall()
+        return [{"role": role, "content": content, "timestamp": timestamp}
+                for role, content, timestamp in rows]
+
+
+class WriteBehindStore:
+    """Buffers session events and writes them to ``backend`` from a background thread"""
+
+    def __init__(self, backend, flush_interval: float = FLUSH_INTERVAL, batch_size: int = FLUSH_BATCH):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: List[Event] = []
+        self._cond = threading.Condition()
+        # Held across swap-and-write so batches reach the backend in order
+        self._write_lock = threading.Lock()
+        self.batches_written = 0
+        self.events_written = 0
+        self._worker = threading.Thread(target=self._run, name="learner-session-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.flush)
+
+    def append(self, session_id: str, message: Dict[str, str]):
+        self._enqueue((session_id, "message", message["role"], message["content"], message.get("timestamp", "")))
+
+    def clear(self, session_id: str):
+        self._enqueue((session_id, "clear", "", "", ""))
+
+    def _enqueue(self, event: Event):
+        with self._cond:
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything buffered so far"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    self.backend.write_batch(batch)
+                except Exception:
+                    # Put the batch back in front so nothing is lost or reordered
+                    with self._cond:
+                        self._pending[:0] = batch
+                    raise
+                self.batches_written += 1
+                self.events_written += len(batch)
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        """A session's messages, including events not yet written"""
+        self.flush()
+        return self.backend.load(session_id)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the writer alive; the batch is retried on the next pass
+                print(f"Session store flush failed: {e}")
+
+
+def store_from_spec(spec: str) -> Optional[WriteBehindStore]:
+    """Build a store from ``sqlite:<path>``; empty disables persistence"""
+    if not spec:
+        return None
+    if spec.startswith("sqlite:"):
+        return WriteBehindStore(SQLiteSessionBackend(spec[len("sqlite:"):] or "learner_sessions.db"))
+    raise ValueError(f"Unknown session store backend: {spec}")
+
+
+_store: Optional[WriteBehindStore] = None
+_store_ready = False
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[WriteBehindStore]:
+    """The process-wide session store, created on first use; None when disabled"""
+    global _store, _store_ready
+    if not _store_ready:
+        with _store_lock:
+            if not _store_ready:
+                _store = store_from_spec(SESSION_STORE)
+                _store_ready = True
+    return _store
+
+
+def set_session_store(store: Optional[WriteBehindStore]):
+    """Install (or with None, disable) the process-wide session store"""
+    global _store, _store_ready
+    with _store_lock:
+        _store, _store_ready = store, True
+
+
+def browser_session_id() -> str:
+    """The chat session id of the current browser, from a cookie
+
+    The id used to live in a ``?sid=`` query parameter, so a copied link put
+    everyone who opened it into the same session.  A cookie stays with the
+    browser: a reload or another server process finds the same session, a
+    shared link does not.
+    """
+    import streamlit as st
+
+    from .theme import _embed_html
+
+    if "sid" in st.query_params:
+        # Links shared before the move to cookies
+        del st.query_params["sid"]
+    session_id = st.context.cookies.get(SESSION_COOKIE)
+    # Anything but an id we issued starts a fresh session
+    if isinstance(session_id, str) and _SESSION_ID.fullmatch(session_id):
+        return session_id
+    session_id = uuid.uuid4().hex
+    cookie = f"{SESSION_COOKIE}={session_id}; path=/; max-age={SESSION_COOKIE_DAYS * 86400}; SameSite=Strict"
+    _embed_html(f"<script>window.parent.document.cookie = {json.dumps(cookie)};</script>")
+    return session_id
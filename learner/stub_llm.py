@@ -0,0 +1,247 @@
+"""Offline stand-in for an OpenAI-compatible chat-completions server.
+
+For load tests, benchmarks and CI: replies take a configurable time to the
+first token, stream at a configurable token rate and fail at a configurable
+rate, without network access or API spend.  Run it as a server::
+
+    python -m learner.stub_llm --port 8001 --latency 0.4 --tokens-per-second 40 --error-rate 0.02
+
+and point the app at it with ``LEARNER_BACKENDS='[{"name": "stub", "url":
+"http://127.0.0.1:8001/v1/chat/completions", "model": "stub"}]'`` (and
+``LEARNER_RATE_LIMIT_RPM=0``, so the client-side limiter does not throttle
+the test).  ``{"kind": "stub"}`` is an in-process backend with the same
+behaviour that skips HTTP altogether.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+from .context import estimate_tokens
+from .llm_client import LLMError
+from .router import Backend
+
+_VOCABULARY = (
+    "concept idea example practice review recall connect explain compare apply "
+    "step reason evidence pattern model summary question answer detail context "
+    "principle structure analogy memory picture test understand build check"
+).split()
+
+
+def _text(content) -> str:
+    if not isinstance(content, str):
+        content = "".join(part.get("text", "") for part in content)
+    return content
+
+
+class StubLLM:
+    """Timing, failure and reply model shared by the stub server and backend"""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, tokens_per_second: float = 50.0,
+                 reply_tokens: int = 80, error_rate: float = 0.0, error_status: int = 503,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Requests seen, failed ones included
+        self.requests = 0
+
+    def first_token_delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def failure(self) -> Optional[int]:
+        """HTTP status of an injected failure, or None"""
+        with self._lock:
+            self.requests += 1
+            return self.error_status if self._random.random() < self.error_rate else None
+
+    def reply(self, messages: List[Dict]) -> List[str]:
+        """Deterministic reply tokens, so identical prompts get identical replies"""
+        last = next((_text(m["content"]) for m in reversed(messages) if m["role"] == "user"), "")
+        topic = " ".join(last.split()[:6]) or "Getting started"
+        seed = hashlib.sha256(last.encode("utf-8")).digest()
+        words = random.Random(seed).choices(_VOCABULARY, k=self.reply_tokens)
+        # The concept trailer keeps the app's concept tracking busy, as with a real tutor
+        return [word + " " for word in words] + [f"\n\n**Current Concept:** [{topic}]"]
+
+    def usage(self, messages: List[Dict], tokens: List[str]) -> Dict[str, int]:
+        prompt = sum(estimate_tokens(_text(m["content"])) for m in messages)
+        return {"prompt_tokens": prompt, "completion_tokens": len(tokens),
+                "total_tokens": prompt + len(tokens)}
+
+    def complete(self, messages: List[Dict]) -> str:
+        status = self.failure()
+        if status is not None:
+            raise LLMError(status, "Injected failure")
+        tokens = self.reply(messages)
+        time.sleep(self.first_token_delay() + self.token_delay() * len(tokens))
+        return "".join(tokens)
+
+    def stream(self, messages: List[Dict]) -> Iterator[str]:
+        status = self.failure()
+        if status is not None:
+            raise LLMError(status, "Injected failure")
+        time.sleep(self.first_token_delay())
+        for token in self.reply(messages):
+            time.sleep(self.token_delay())
+            yield token
+
+
+class StubBackend(Backend):
+    """In-process backend answering from a :class:`StubLLM`"""
+
+    def __init__(self, name: str = "stub", model: str = "stub", llm: Optional[StubLLM] = None):
+        super().__init__(name, f"stub://{name}", model)
+        self.llm = llm or StubLLM()
+
+    def complete(self, api_key: str, messages: List[Dict]) -> str:
+        return self.llm.complete(messages)
+
+    def stream(self, api_key: str, messages: List[Dict]) -> Iterator[str]:
+        return self.llm.stream(messages)
+
+
+_LLM_OPTIONS = ("latency", "jitter", "tokens_per_second", "reply_tokens", "error_rate", "error_status", "seed")
+
+
+def stub_backend(entry: Dict) -> Backend:
+    """A :class:`StubBackend` from a ``{"kind": "stub", ...}`` spec entry"""
+    llm = StubLLM(**{key: entry[key] for key in _LLM_OPTIONS if key in entry})
+    return StubBackend(entry.get("name", "stub"), entry.get("model", "stub"), llm)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so the app's pooled session reuses connections as with the real API
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"No route for {self.path}"}})
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        llm: StubLLM = self.server.llm
+        status = llm.failure()
+        if status is not None:
+            # A short Retry-After exercises the client's retry path
+            self._send_json(status, {"error": {"message": "Injected failure", "code": status}},
+                            {"Retry-After": "1"} if status == 429 else None)
+            return
+        messages = payload.get("messages", [])
+        model = payload.get("model", "stub")
+        tokens = llm.reply(messages)
+        time.sleep(llm.first_token_delay())
+        try:
+            if payload.get("stream"):
+                self._stream(model, messages, tokens, llm)
+            else:
+                time.sleep(llm.token_delay() * len(tokens))
+                self._send_json(200, {
+                    "id": "stub", "object": "chat.completion", "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": llm.usage(messages, tokens),
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away mid-reply
+            self.close_connection = True
+
+    def _stream(self, model: str, messages: List[Dict], tokens: List[str], llm: StubLLM):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(llm.token_delay())
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": token}}]}
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        # Like OpenRouter, close the stream with the usage block
+        chunk = {"id": "stub", "object": "chat.completion.chunk", "model": model, "choices": [],
+                 "usage": llm.usage(messages, tokens)}
+        self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is routine, not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def _make_server(llm: StubLLM, host: str, port: int) -> ThreadingHTTPServer:
+    server = _Server((host, port), _Handler)
+    server.llm = llm
+    server.url = f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+    return server
+
+
+def start_stub_server(llm: Optional[StubLLM] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> ThreadingHTTPServer:
+    """Serve ``llm`` on a background thread; ``server.url`` is its completions URL
+
+    Port 0 picks a free port.  Stop it with ``server.shutdown()``.
+    """
+    server = _make_server(llm or StubLLM(), host, port)
+    threading.Thread(target=server.serve_forever, name="learner-stub-llm", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to the first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds added to the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="0 streams without delay")
+    parser.add_argument("--reply-tokens", type=int, default=80)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    llm = StubLLM(args.latency, args.jitter, args.tokens_per_second, args.reply_tokens,
+                  args.error_rate, args.error_status, args.seed)
+    server = _make_server(llm, args.host, args.port)
+    print(f"Stub LLM at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
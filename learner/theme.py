@@ -0,0 +1,150 @@
+"""Gemini-style theme, delivered once per browser page.
+
+The stylesheets and sidebar script live in ``static/``.  Each rerun only
+sends a small loader (rendered in an iframe with no visible content) that
+adds the stylesheet to the parent page if that version is not there yet
+and installs the sidebar observer once.  With Streamlit static serving
+enabled the loader fetches the CSS and script by version-hashed URLs, so
+the browser caches them; otherwise both are inlined into the loader.
+Extra CSS built at runtime (the icon sprite) rides along with a session's
+first loader only and stays on the page for later reruns.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+SIDEBAR_SCRIPT = "sidebar.js"
+
+_assets: Dict[str, str] = {}
+_loaders: Dict[tuple, str] = {}
+_lock = threading.Lock()
+
+_LOADER = """<script>
+(function () {{
+    const doc = window.parent.document;
+    const id = "learner-theme-{version}";
+    if (!doc.getElementById(id)) {{
+        // Drop styles left by an older theme version
+        doc.querySelectorAll('style[id^="learner-theme-"]').forEach(el => el.remove());
+        const style = doc.createElement("style");
+        style.id = id;
+        doc.head.appendChild(style);
+        {load}
+    }}
+{extra}}})();
+{script}
+</script>"""
+
+_EXTRA = """    if (!doc.getElementById("learner-extra-{version}")) {{
+        doc.querySelectorAll('style[id^="learner-extra-"]').forEach(el => el.remove());
+        const extra = doc.createElement("style");
+        extra.id = "learner-extra-{version}";
+        extra.textContent = {css};
+        doc.head.appendChild(extra);
+    }}
+"""
+
+
+def load_asset(name: str) -> str:
+    """Contents of a file in ``static/``, read once per process"""
+    text = _assets.get(name)
+    if text is None:
+        with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as asset_file:
+            text = asset_file.read()
+        _assets[name] = text
+    return text
+
+
+def theme_version(stylesheets: List[str]) -> str:
+    """Short content hash identifying these stylesheets and the sidebar script"""
+    digest = hashlib.sha256()
+    for name in stylesheets + [SIDEBAR_SCRIPT]:
+        digest.update(load_asset(name).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def css_version(css: str) -> str:
+    """Short content hash of runtime-built CSS"""
+    return hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+
+def theme_loader(stylesheets: List[str], static_url: Optional[str] = None, extra_css: str = "") -> str:
+    """Loader markup; fetches from ``static_url`` when given, else inlines the CSS
+
+    ``extra_css`` is added to the page as its own stylesheet, once.
+    """
+    key = (tuple(stylesheets), static_url, css_version(extra_css) if extra_css else None)
+    with _lock:
+        html = _loaders.get(key)
+        if html is None:
+            version = theme_version(stylesheets)
+            if static_url is not None:
+                urls = [f"{static_url}/{name}?v={version}" for name in stylesheets]
+                load = (
+                    f"Promise.all({json.dumps(urls)}.map(url => fetch(url).then(r => r.text())))"
+                    ".then(parts => { style.textContent = parts.join('\\n'); });"
+                )
+            else:
+                css = "\n".join(load_asset(name) for name in stylesheets)
+                load = f"style.textContent = {json.dumps(css)};"
+            if static_url is not None:
+                script_url = f"{static_url}/{SIDEBAR_SCRIPT}?v={version}"
+                script = (
+                    f"if (!window.parent.__learnerSidebarObserver) {{ fetch({json.dumps(script_url)})"
+                    ".then(r => r.text()).then(js => new Function(js)()); }"
+                )
+            else:
+                script = load_asset(SIDEBAR_SCRIPT)
+            extra = _EXTRA.format(version=key[2], css=json.dumps(extra_css)) if extra_css else ""
+            html = _LOADER.format(version=version, load=load, extra=extra, script=script)
+            _loaders[key] = html
+    return html
+
+
+def static_url(app_static_dir: str, stylesheets: List[str], base_url_path: str = "") -> Optional[str]:
+    """URL prefix Streamlit serves ``app_static_dir`` under, or None if it cannot"""
+    if not all(os.path.exists(os.path.join(app_static_dir, name)) for name in stylesheets):
+        return None
+    base = base_url_path.strip("/")
+    return f"/{base}/app/static" if base else "/app/static"
+
+
+def _embed_html(html: str):
+    """Run invisible markup in an iframe that can reach the app's page
+
+    st.iframe replaces components.html, which is deprecated and goes after
+    2026-06-01; Streamlit releases before st.iframe only have the latter.
+    """
+    import streamlit as st
+
+    if hasattr(st, "iframe"):
+        # Sized to its content, which is nothing visible
+        st.iframe(html, height="content")
+    else:
+        import streamlit.components.v1 as components
+
+        components.html(html, height=0)
+
+
+def inject_theme(stylesheets: List[str], app_file: str, extra_css: str = "") -> int:
+    """Render the theme loader for the app at ``app_file``; returns bytes sent"""
+    import streamlit as st
+
+    url = None
+    if st.get_option("server.enableStaticServing"):
+        app_static_dir = os.path.join(os.path.dirname(os.path.abspath(app_file)), "static")
+        url = static_url(app_static_dir, stylesheets, st.get_option("server.baseUrlPath") or "")
+    if extra_css:
+        # Sent with this session's first loader; later reruns find it on the page
+        version = css_version(extra_css)
+        if st.session_state.get("_learner_theme_extra") == version:
+            extra_css = ""
+        else:
+            st.session_state["_learner_theme_extra"] = version
+    html = theme_loader(stylesheets, url, extra_css)
+    # Identical markup on every rerun, so the browser keeps the same iframe
+    _embed_html(html)
+    return len(html.encode("utf-8"))
@@ -0,0 +1,61 @@
+"""The sidebar tools as data, for front ends other than the Streamlit apps.
+
+Each tool pre-fills the message with its instruction; the student's topic
+follows it, as when a sidebar button is pressed and the message typed on.
+"""
+from typing import Dict, List, Optional, Tuple
+
+NAVIGATION_TOOLS: List[Tuple[str, str]] = [
+    ("Next Concept", "Move to the next learning concept or topic in the current subject area:"),
+    ("Previous Concept", "Return to the previous learning concept or topic we covered:"),
+    ("Concept History", "List all the concepts and topics we have navigated through in our learning session:"),
+]
+
+LEARNING_TOOLS: List[Tuple[str, str]] = [
+    ("Structure: Syllabus", "Provide a Table of Content based on relevancy for the current Concept:"),
+    ("Structure: Table", "Make me a table of that capture of most important information regarding: Current Topic"),
+    ("Structure: Chunk", "Break large amounts of information into smaller, manageable pieces that are easier to process and remember:"),
+    ("Complexity: Novice", "Make me a table of that capture of most important information regarding: Current Topic"),
+    ("Complexity: Rephrase", "Express the same information in different ways to reinforce understanding and accommodate different learning preferences:"),
+    ("Complexity: Define", "Identify and clearly explain specialized terminology, replacing complex language with simpler alternatives when possible:"),
+    ("Complexity: Takeaways", "Start with the overall concept or framework before diving into details, helping students see how pieces fit together:"),
+    ("Grounding: Analogy", "Compare new concepts to familiar things the student already knows to make complex ideas easier to understand:"),
+    ("Grounding: Examples", "Take the abstract concepts and provide real-world examples and application"),
+    ("Devices: Memory", "Use memory aids like acronyms, rhymes, or visual associations to help students remember key information:"),
+    ("Devices: Visualize", "Encourage visualization and mental imagery to help students create vivid mental representations of concepts:"),
+]
+
+ASSESSMENT_TOOLS: List[Tuple[str, str]] = [
+    ("Multiple Choice", "Present questions with several answer options to test recognition and understanding:"),
+    ("True/False", "Create simple binary questions that test basic comprehension of facts or concepts:"),
+    ("Matching", "Connect related items, terms, or concepts to test understanding of relationships:"),
+    ("Fill-in Blanks", "Test recall by having students complete sentences or phrases with missing key terms:"),
+    ("Short Response", "Brief written answers that require students to explain concepts in their own words:"),
+    ("Error Spotting", "Present incorrect information for students to identify and correct, testing critical thinking:"),
+    ("Compare and Contrast", "Using analogies,smilies, compare and contrast these concepts with other concepts"),
+    ("Deep Thinking", "Open-ended questions that require analysis, synthesis, or evaluation of complex concepts:"),
+    ("Tutor Mode", "I will now act as the teacher, you should act like a student and help me understand:"),
+]
+
+# Every assessment type at once; the topic defaults to the current concept
+FULL_QUIZ = "Generate Full Quiz"
+
+QUIZ_TYPES: List[Tuple[str, str]] = [tool for tool in ASSESSMENT_TOOLS if tool[0] != "Tutor Mode"]
+
+_INSTRUCTIONS: Dict[str, str] = dict(NAVIGATION_TOOLS + LEARNING_TOOLS + ASSESSMENT_TOOLS)
+
+
+def tool_instruction(label: str) -> Optional[str]:
+    """The instruction a tool pre-fills, or None for an unknown label"""
+    return _INSTRUCTIONS.get(label)
+
+
+def tool_catalogue() -> Dict[str, List[Dict[str, str]]]:
+    """Every tool by sidebar section"""
+    def entries(tools):
+        return [{"label": label, "instruction": instruction} for label, instruction in tools]
+    return {
+        "navigation": entries(NAVIGATION_TOOLS),
+        "learning": entries(LEARNING_TOOLS),
+        "assessment": entries(ASSESSMENT_TOOLS) + [{"label": FULL_QUIZ, "instruction": ""}],
+    }
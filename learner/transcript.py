@@ -0,0 +1,40 @@
+"""Paginated chat transcript rendering.
+
+Only the newest page of messages is drawn on each rerun; older turns stay
+hidden behind a "Load earlier" button, so render time is bounded by the
+page size rather than the length of the conversation.
+"""
+import os
+import time
+from typing import Dict, List
+
+from .concepts import split_trailer
+
+TRANSCRIPT_PAGE_SIZE = int(os.environ.get("LEARNER_TRANSCRIPT_PAGE_SIZE", "20"))
+
+
+def render_transcript(messages: List[Dict[str, str]], page_size: int = TRANSCRIPT_PAGE_SIZE) -> Dict:
+    """Draw the visible messages; returns render stats for this rerun"""
+    import streamlit as st
+
+    start_time = time.perf_counter()
+    if "visible_messages" not in st.session_state:
+        st.session_state.visible_messages = page_size
+    hidden = max(len(messages) - st.session_state.visible_messages, 0)
+    if hidden:
+        if st.button(f"⬆️ Load earlier messages ({hidden} hidden)", key="load_earlier"):
+            st.session_state.visible_messages += page_size
+            st.rerun()
+    for message in messages[hidden:]:
+        content, concept = message["content"], None
+        if message["role"] == "assistant":
+            # The concept trailer is for the timeline; it is shown as a caption
+            content, concept = split_trailer(content)
+        with st.chat_message(message["role"]):
+            st.write(content)
+            st.caption(f"🕒 {message['timestamp']}" + (f" · 📍 {concept}" if concept else ""))
+    return {
+        "rendered": len(messages) - hidden,
+        "total": len(messages),
+        "ms": (time.perf_counter() - start_time) * 1000,
+    }
@@ -0,0 +1,174 @@
+"""Token accounting and per-session token budgets.
+
+The LLM client reports the ``usage`` block a backend returns (in the JSON
+reply, or the final chunk of a stream) keyed by the request's messages.
+When the app records a turn it picks that up, or falls back to the local
+estimate from :mod:`learner.context` for backends that omit usage.  Replies
+that never went upstream (response-cache hits, and calls coalesced into
+another session's) are booked at zero tokens.  Turns are totalled per
+session and per sidebar tool, process-wide.
+
+``LEARNER_SESSION_TOKEN_BUDGET`` caps the tokens one session may use; a
+request that would go over it is refused before it is sent.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from .context import estimate_tokens, message_tokens
+
+# 0 means unlimited
+SESSION_TOKEN_BUDGET = int(os.environ.get("LEARNER_SESSION_TOKEN_BUDGET", "0"))
+# Sessions whose totals are kept, least recently active dropped first
+LEDGER_SESSIONS = int(os.environ.get("LEARNER_LEDGER_SESSIONS", "10000"))
+# Recent turns kept per session for display
+LEDGER_TURNS = 50
+
+
+class TokenBudgetExceeded(Exception):
+    """A request would take a session past its token budget"""
+
+    def __init__(self, used: int, needed: int, budget: int):
+        super().__init__(
+            f"This session has used {used:,} of its {budget:,} tokens and the next request "
+            f"needs about {needed:,} more. Please ask your teacher to raise the limit."
+        )
+        self.used = used
+        self.needed = needed
+        self.budget = budget
+
+
+def usage_key(messages: List[Dict]) -> str:
+    raw = json.dumps([[m["role"], m["content"]] for m in messages], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+_reported: "OrderedDict[str, Dict]" = OrderedDict()
+_reported_lock = threading.Lock()
+
+
+def report_usage(messages: List[Dict], usage: Optional[Dict]):
+    """Called by the LLM client with the usage a backend returned for ``messages``"""
+    if not usage:
+        return
+    with _reported_lock:
+        _reported[usage_key(messages)] = usage
+        while len(_reported) > 1024:
+            _reported.popitem(last=False)
+
+
+def report_cached(messages: List[Dict]):
+    """Called by the LLM client when ``messages`` were answered from the response cache"""
+    report_usage(messages, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached": True})
+
+
+def _take_reported_usage(messages: List[Dict]) -> Optional[Dict]:
+    # Taken, not read: a later call with the same messages must report its own
+    with _reported_lock:
+        return _reported.pop(usage_key(messages), None)
+
+
+def _empty_totals() -> Dict[str, int]:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "turns": 0,
+            "coalesced": 0, "cached": 0}
+
+
+def _add(totals: Dict[str, int], turn: Dict):
+    totals["prompt_tokens"] += turn["prompt_tokens"]
+    totals["completion_tokens"] += turn["completion_tokens"]
+    totals["total_tokens"] += turn["prompt_tokens"] + turn["completion_tokens"]
+    totals["turns"] += 1
+    totals["coalesced"] += turn["coalesced"]
+    totals["cached"] += turn["cached"]
+
+
+class TokenLedger:
+    """Token use per turn, per session and per tool, for the whole process"""
+
+    def __init__(self, max_sessions: int = LEDGER_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._tools: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> Dict:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {
+                "totals": _empty_totals(), "tools": {}, "turns": deque(maxlen=LEDGER_TURNS)
+            }
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def record(self, session_id: str, tool: str, messages: List[Dict], reply: str,
+               coalesced: bool = False) -> Dict:
+        """Account one request and its reply; returns the turn's entry
+
+        A ``coalesced`` reply was shared from an identical request another
+        session paid for, and a cached one came from the response cache; both
+        are booked at no upstream tokens.
+        """
+        usage = _take_reported_usage(messages)
+        cached = bool(usage and usage.get("cached")) and not coalesced
+        if coalesced or cached:
+            prompt, completion, estimated = 0, 0, False
+        elif usage and usage.get("prompt_tokens") is not None:
+            prompt, completion, estimated = usage["prompt_tokens"], usage.get("completion_tokens") or 0, False
+        else:
+            prompt, completion, estimated = estimate_prompt_tokens(messages), estimate_tokens(reply), True
+        turn = {"tool": tool, "prompt_tokens": prompt, "completion_tokens": completion,
+                "estimated": estimated, "coalesced": coalesced, "cached": cached, "time": time.time()}
+        with self._lock:
+            session = self._session(session_id)
+            _add(session["totals"], turn)
+            _add(session["tools"].setdefault(tool, _empty_totals()), turn)
+            _add(self._tools.setdefault(tool, _empty_totals()), turn)
+            session["turns"].append(turn)
+        return turn
+
+    def used(self, session_id: str) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session["totals"]["total_tokens"] if session else 0
+
+    def check_budget(self, session_id: str, messages: List[Dict], budget: int = SESSION_TOKEN_BUDGET,
+                     requests: int = 1):
+        """Raise :class:`TokenBudgetExceeded` if ``requests`` copies of this prompt do not fit"""
+        if budget <= 0:
+            return
+        used = self.used(session_id)
+        needed = estimate_prompt_tokens(messages) * requests
+        if used + needed > budget:
+            raise TokenBudgetExceeded(used, needed, budget)
+
+    def session_stats(self, session_id: str) -> Dict:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return {"totals": _empty_totals(), "tools": {}, "turns": []}
+            return {"totals": dict(session["totals"]),
+                    "tools": {tool: dict(totals) for tool, totals in session["tools"].items()},
+                    "turns": list(session["turns"])}
+
+    def tool_stats(self) -> Dict[str, Dict[str, int]]:
+        """Totals per tool across every session"""
+        with self._lock:
+            return {tool: dict(totals) for tool, totals in self._tools.items()}
+
+
+_ledger = TokenLedger()
+
+
+def get_ledger() -> TokenLedger:
+    """The process-wide token ledger"""
+    return _ledger
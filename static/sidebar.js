@@ -0,0 +1,64 @@
+// Hide the sidebar collapse button in the Streamlit page.
+// Runs in the theme loader iframe; `doc` and `win` are the parent page's.
+(function (doc, win) {
+    // One observer per page, however many times the script is re-sent
+    if (win.__learnerSidebarObserver) {
+        return;
+    }
+
+    function hideSidebarToggle() {
+        // Try multiple selectors to find and hide the toggle button
+        const selectors = [
+            'button[kind="header"]',
+            'button[data-testid="collapsedControl"]',
+            'button[data-testid="baseButton-header"]',
+            '.css-1rs6os',
+            '.css-1544g2n',
+            '.css-1cypcdb',
+            '.css-1avcm0n',
+            'button[aria-label*="collapse"]',
+            'button[aria-label*="expand"]'
+        ];
+
+        selectors.forEach(selector => {
+            const elements = doc.querySelectorAll(selector);
+            elements.forEach(el => {
+                el.style.display = 'none';
+                el.style.visibility = 'hidden';
+            });
+        });
+
+        // Also hide any buttons with chevron/arrow icons in sidebar area
+        const allButtons = doc.querySelectorAll('button');
+        allButtons.forEach(button => {
+            const svg = button.querySelector('svg');
+            if (svg && (svg.innerHTML.includes('chevron') || svg.innerHTML.includes('arrow'))) {
+                // Check if this looks like a sidebar toggle
+                const rect = button.getBoundingClientRect();
+                if (rect.left < 100) { // Likely in sidebar area
+                    button.style.display = 'none';
+                }
+            }
+        });
+    }
+
+    // Run immediately and also with delays to catch dynamically loaded content
+    hideSidebarToggle();
+    setTimeout(hideSidebarToggle, 100);
+    setTimeout(hideSidebarToggle, 500);
+    setTimeout(hideSidebarToggle, 1000);
+
+    // Coalesce bursts of DOM changes into one pass per animation frame
+    let scheduled = false;
+    const observer = new MutationObserver(() => {
+        if (!scheduled) {
+            scheduled = true;
+            win.requestAnimationFrame(() => {
+                scheduled = false;
+                hideSidebarToggle();
+            });
+        }
+    });
+    observer.observe(doc.body, { childList: true, subtree: true });
+    win.__learnerSidebarObserver = observer;
+})(window.parent.document, window.parent);
@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Read when learner is first imported: no session database, and no client-side
+# throttling unless a test sets up its own buckets
+os.environ.setdefault("LEARNER_SESSION_STORE", "")
+os.environ.setdefault("LEARNER_RATE_LIMIT_RPM", "0")
+os.environ.setdefault("LEARNER_MAX_RETRIES", "3")
+os.environ.setdefault("LEARNER_BACKOFF_BASE", "0.2")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from learner.stub_llm import StubLLM, start_stub_server  # noqa: E402
+
+
+@pytest.fixture
+def stub_server():
+    """Start stub servers on free ports; all are shut down after the test"""
+    servers = []
+
+    def start(**options):
+        options.setdefault("latency", 0.01)
+        options.setdefault("jitter", 0.0)
+        options.setdefault("tokens_per_second", 0)
+        options.setdefault("reply_tokens", 10)
+        server = start_stub_server(StubLLM(seed=0, **options))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
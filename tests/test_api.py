@@ -0,0 +1,122 @@
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from learner import router as router_module
+from learner.router import Backend, Router
+from learner.service import TutorService
+from learner.usage import TokenLedger
+
+uvicorn = pytest.importorskip("uvicorn")
+from learner.api import TutorAPI  # noqa: E402
+
+KEY = {"Authorization": "Bearer test-key"}
+
+
+@pytest.fixture
+def api(stub_server):
+    """Base URL of a TutorAPI served by uvicorn, answering from a stub LLM"""
+    previous = router_module._router
+    llm = stub_server()
+    router_module.set_router(Router([Backend("stub", llm.url, "stub")], hedge_percentile=None))
+    service = TutorService()
+    service.ledger = TokenLedger()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(TutorAPI(service), log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    thread.join(5)
+    router_module.set_router(previous)
+
+
+def wait_for_syllabus(api, session, status):
+    for _ in range(200):
+        progress = requests.get(f"{api}/sessions/{session}/syllabus", headers=KEY).json()
+        if progress["status"] == status:
+            return progress
+        time.sleep(0.02)
+    raise AssertionError(f"syllabus never reached {status}: {progress}")
+
+
+def test_failed_upload_keeps_the_previous_syllabus(api):
+    good = requests.put(f"{api}/sessions/s1/syllabus?name=a.txt", data=b"Week 1: osmosis and diffusion",
+                        headers={**KEY, "Content-Type": "text/plain"})
+    assert good.status_code in (200, 202)
+    assert wait_for_syllabus(api, "s1", "done")["attached"] == "a.txt"
+
+    bad = requests.put(f"{api}/sessions/s1/syllabus?name=b.pdf", data=b"not a pdf at all",
+                       headers={**KEY, "Content-Type": "application/pdf"})
+    assert bad.status_code in (200, 202, 415)
+    failed = wait_for_syllabus(api, "s1", "failed")
+    assert failed["name"] == "b.pdf" and failed["attached"] == "a.txt"
+
+    reply = requests.post(f"{api}/sessions/s1/chat", json={"message": "What is osmosis?"}, headers=KEY)
+    assert reply.status_code == 200
+    messages = requests.get(f"{api}/sessions/s1/messages", headers=KEY).json()["messages"]
+    assert messages[0]["content"].endswith("**Attached file:** a.txt")
+
+
+def test_session_endpoints_need_the_sessions_key(api):
+    assert requests.post(f"{api}/sessions/s1/chat", json={"message": "Hi"}, headers=KEY).status_code == 200
+    other = {"Authorization": "Bearer someone-else"}
+    for method, path in [("GET", "messages"), ("GET", "syllabus"), ("POST", "chat")]:
+        url = f"{api}/sessions/s1/{path}"
+        assert requests.request(method, url, json={"message": "Hi"}).status_code == 401
+        assert requests.request(method, url, json={"message": "Hi"}, headers=other).status_code == 403
+    assert requests.delete(f"{api}/sessions/s1").status_code == 401
+    assert requests.delete(f"{api}/sessions/s1", headers=other).status_code == 403
+    assert len(requests.get(f"{api}/sessions/s1/messages", headers=KEY).json()["messages"]) == 2
+
+    # Clearing a session keeps it with its key
+    assert requests.delete(f"{api}/sessions/s1", headers=KEY).json()["cleared"] is True
+    assert requests.get(f"{api}/sessions/s1/messages", headers=KEY).json()["messages"] == []
+    assert requests.get(f"{api}/sessions/s1/messages", headers=other).status_code == 403
+
+
+def test_error_statuses(api):
+    assert requests.get(f"{api}/nowhere").status_code == 404
+    assert requests.get(f"{api}/sessions/s1/chat", headers=KEY).status_code == 405
+    assert requests.post(f"{api}/sessions/s1/tools/Nonsense", json={}, headers=KEY).status_code == 404
+    assert requests.get(f"{api}/sessions/s1/syllabus", headers=KEY).status_code == 404
+    assert requests.post(f"{api}/sessions/s1/chat", json={"message": "  "}, headers=KEY).status_code == 400
+    assert requests.post(f"{api}/sessions/s1/chat", data=b"not json", headers=KEY).status_code == 400
+
+    unsupported = requests.put(f"{api}/sessions/s1/syllabus?name=a.zip", data=b"PK\x03\x04",
+                               headers={**KEY, "Content-Type": "application/zip"})
+    assert unsupported.status_code == 415
+    assert "error" in unsupported.json()
+
+
+def test_upload_then_chat_uses_the_syllabus(api):
+    upload = requests.put(f"{api}/sessions/s2/syllabus?name=syl.txt",
+                          data=b"Week 1: cells\nWeek 2: photosynthesis and chlorophyll",
+                          headers={**KEY, "Content-Type": "text/plain"})
+    assert upload.status_code in (200, 202)
+    assert upload.json()["name"] == "syl.txt"
+    progress = wait_for_syllabus(api, "s2", "done")
+    assert progress["attached"] == "syl.txt" and progress["chunks"] >= 1
+
+    reply = requests.post(f"{api}/sessions/s2/chat", json={"message": "Explain chlorophyll"}, headers=KEY).json()
+    assert reply["concept"].startswith("Explain chlorophyll")
+    messages = requests.get(f"{api}/sessions/s2/messages", headers=KEY).json()["messages"]
+    assert messages[0]["content"] == "Explain chlorophyll\n\n📎 **Attached file:** syl.txt"
+    assert messages[1]["content"] == reply["reply"]
+
+
+def test_chat_streams_server_sent_events(api):
+    response = requests.post(f"{api}/sessions/s3/chat", json={"message": "Teach me osmosis", "stream": True},
+                             headers=KEY, stream=True)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.iter_lines(decode_unicode=True)
+              if line.startswith("event: ")]
+    assert events[-1] == "done" and set(events[:-1]) == {"token"}
+    messages = requests.get(f"{api}/sessions/s3/messages", headers=KEY).json()["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant"]
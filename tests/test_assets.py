@@ -0,0 +1,21 @@
+from learner.assets import IconRegistry
+from learner.theme import theme_loader
+
+SIDEBAR = ["assets/icons/next.png", "assets/icons/history.png"]
+
+
+def test_sprite_holds_only_the_icons_asked_for():
+    icons = IconRegistry()
+    css = icons.sprite_css(SIDEBAR)
+    assert icons.css_class("next.png") in css and icons.css_class("history.png") in css
+    assert icons.css_class("gemma3.png") not in css
+    assert len(css) < 5000
+
+
+def test_loader_carries_extra_css_only_when_given():
+    css = IconRegistry().sprite_css(SIDEBAR)
+    with_sprite = theme_loader(["gemini.css"], "/app/static", css)
+    without = theme_loader(["gemini.css"], "/app/static")
+    assert "learner-extra-" in with_sprite and "learner-icon-next" in with_sprite
+    assert "learner-extra-" not in without
+    assert len(without) < 1000
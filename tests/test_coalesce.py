@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from learner import router as router_module
+from learner.coalesce import SingleFlight, request_key
+from learner.llm_client import LLMError
+from learner.router import Backend, Router
+from learner.service import TutorService
+from learner.usage import TokenLedger
+
+MESSAGES = [{"role": "user", "content": "Explain the Calvin cycle"}]
+
+
+@pytest.fixture
+def stub_router(stub_server):
+    """Route through a slow stub server, restoring the process router afterwards"""
+    previous = router_module._router
+    server = stub_server(latency=0.3)
+    router_module.set_router(Router([Backend("stub", server.url, "stub")], hedge_percentile=None))
+    yield server
+    router_module.set_router(previous)
+
+
+def test_identical_concurrent_requests_make_one_upstream_call(stub_router):
+    flight = SingleFlight()
+    router = router_module.get_router()
+    key = request_key(router.model, MESSAGES)
+    with ThreadPoolExecutor(10) as pool:
+        results = list(pool.map(lambda _: flight.flight(key, lambda: router.complete("key", MESSAGES)), range(10)))
+    assert stub_router.llm.requests == 1
+    assert len({reply for reply, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 9
+    assert flight.stats()["collapsed"] == 9
+
+
+def test_leader_errors_are_not_given_to_followers():
+    flight = SingleFlight()
+    leader_started = threading.Event()
+
+    def rejected():
+        leader_started.set()
+        time.sleep(0.2)
+        raise LLMError(401, "bad key")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.flight, "k", rejected)
+        leader_started.wait()
+        follower = pool.submit(flight.flight, "k", lambda: "answer with a good key")
+        with pytest.raises(LLMError):
+            leader.result()
+        assert follower.result() == ("answer with a good key", False)
+    assert flight.stats()["retried"] == 1
+
+
+def test_stream_follower_retries_when_the_leader_fails_before_answering():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def rejected():
+        release.wait()
+        raise LLMError(429, "key rate limited")
+        yield  # pragma: no cover
+
+    leader = flight.stream("k", rejected)
+    follower = flight.stream("k", lambda: iter(["own ", "reply"]))
+    release.set()
+    with pytest.raises(LLMError):
+        list(leader)
+    assert list(follower) == ["own ", "reply"]
+    assert not follower.shared
+
+
+def test_stream_followers_share_the_leaders_tokens():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def upstream():
+        release.wait()
+        yield from ["a ", "b ", "c"]
+
+    readers = [flight.stream("k", upstream) for _ in range(3)]
+    release.set()
+    assert [list(reader) for reader in readers] == [["a ", "b ", "c"]] * 3
+    assert [reader.shared for reader in readers] == [False, True, True]
+
+
+def test_coalesced_replies_are_not_billed_to_followers(stub_router):
+    service = TutorService()
+    service.ledger = TokenLedger()
+    with ThreadPoolExecutor(2) as pool:
+        replies = list(pool.map(lambda sid: service.complete("key", sid, MESSAGES), ["leader", "follower"]))
+    assert replies[0] == replies[1]
+    assert stub_router.llm.requests == 1
+    totals = [service.ledger.session_stats(sid)["totals"] for sid in ("leader", "follower")]
+    # Whichever thread got there first paid for the call
+    paid, free = sorted(totals, key=lambda t: t["total_tokens"], reverse=True)
+    assert paid["total_tokens"] > 0 and paid["coalesced"] == 0
+    assert free["total_tokens"] == 0 and free["coalesced"] == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from learner.concepts import ConceptTimeline, parse_concept, split_trailer
+
+
+@pytest.mark.parametrize("reply, concept", [
+    ("Plants make sugar.\n\nCurrent Concept:[Photosynthesis]", "Photosynthesis"),
+    ("Plants make sugar.\n\n**Current Concept:** [Photosynthesis]", "Photosynthesis"),
+    ("Plants make sugar.\n\n*Current Concept: [Photosynthesis]*", "Photosynthesis"),
+    ("Plants make sugar.\n\n'Current Concept:[Photosynthesis]'", "Photosynthesis"),
+    ("Welcome!\nCurrent Concept: [Intro [Part 1]]\n", "Intro [Part 1]"),
+    ("Done.\nCurrent Concept: Light reactions", "Light reactions"),
+    ("Done.\nCurrent Concept: [Calvin cycle].", "Calvin cycle"),
+    ("Current Concept:[Cells]\n\nWhere would you like to start?", "Cells"),
+    ("Intro.\n**Current Concept:** [Cells]\nWhere would you like to start?\n", "Cells"),
+    ("Current Concept:[Cells]\nNow on to the next.\nCurrent Concept:[Mitosis]\nReady?", "Mitosis"),
+])
+def test_trailer_is_parsed(reply, concept):
+    assert parse_concept(reply) == concept
+
+
+@pytest.mark.parametrize("reply", [
+    "The current concept: cells are small.\nAsk me anything about them.",
+    "Current concept: cells divide.\nAsk me anything about them.",
+    "Current Concept: []",
+    "",
+])
+def test_prose_is_not_a_trailer(reply):
+    assert parse_concept(reply) is None
+
+
+def test_timeline_follows_trailers():
+    timeline = ConceptTimeline()
+    timeline.update([
+        {"role": "user", "content": "Teach me about current concept: mitosis"},
+        {"role": "assistant", "content": "Sure.\n\n**Current Concept:** [Cells]"},
+        {"role": "assistant", "content": "Next.\n\nCurrent Concept:[Mitosis]"},
+    ])
+    assert timeline.order == ["Cells", "Mitosis"]
+    assert timeline.previous() == "Cells"
+
+
+@pytest.mark.parametrize("reply, shown", [
+    ("Plants make sugar.\n\n**Current Concept:** [Photosynthesis]", "Plants make sugar."),
+    ("Welcome!\n\nCurrent Concept:[Cells]\n\nWhere would you like to start?",
+     "Welcome!\n\nWhere would you like to start?"),
+    ("No trailer here.", "No trailer here."),
+])
+def test_trailer_is_removed_from_the_shown_reply(reply, shown):
+    assert split_trailer(reply)[0] == shown
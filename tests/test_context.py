@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from learner import router as router_module
+from learner.context import CONTEXT_TOKENS, SUMMARY_TOKENS, build_context, fold_turns, new_context_state, summary_due
+from learner.router import Backend, Router
+from learner.service import TutorService
+from learner.usage import TokenLedger
+
+
+def turns(count, chars=40):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{i:03d} " + "x" * chars}
+            for i in range(count)]
+
+
+def test_short_history_is_sent_whole_without_a_summary():
+    messages = turns(4)
+    state = new_context_state()
+    assert summary_due(messages, state, budget_tokens=1000, summary_tokens=100) is None
+    assert build_context(messages, state) == messages
+
+
+def test_summary_is_due_once_the_window_overflows():
+    messages = turns(30)  # about 15 tokens each
+    state = new_context_state()
+    upto, dropped = summary_due(messages, state, budget_tokens=300, summary_tokens=100)
+    assert dropped == messages[:upto] and 0 < upto < len(messages)
+
+    # Until the summary is in, every turn is still sent, under no summary
+    state["summarizing"] = True
+    assert summary_due(messages, state, budget_tokens=300, summary_tokens=100) is None
+    assert build_context(messages, state) == messages
+
+    state.update(summary="Covered the basics", summarized_upto=upto, summarizing=False)
+    sent = build_context(messages, state)
+    assert sent[0] == {"role": "system", "content": "Summary of the earlier conversation:\nCovered the basics"}
+    assert sent[1:] == messages[upto:]
+    assert summary_due(messages, state, budget_tokens=300, summary_tokens=100) is None
+
+
+def test_cleared_history_starts_a_new_epoch():
+    state = new_context_state()
+    state.update(summary="Old", summarized_upto=10, summarizing=True)
+    assert build_context(turns(2), state) == turns(2)
+    assert state["summary"] == "" and not state["summarizing"] and state["epoch"] == 1
+
+
+def test_failed_summarizer_falls_back_to_an_extract():
+    def broken(previous, turns):
+        raise RuntimeError("Error: upstream down")
+
+    summary = fold_turns("Earlier", turns(2), broken)
+    assert summary.startswith("Earlier\nuser: 000")
+
+
+@pytest.fixture
+def service(stub_server):
+    previous = router_module._router
+    server = stub_server(latency=0.5)
+    router_module.set_router(Router([Backend("stub", server.url, "stub")], hedge_percentile=None))
+    service = TutorService()
+    service.ledger = TokenLedger()
+    service.stub = server
+    yield service
+    router_module.set_router(previous)
+
+
+def test_summary_is_made_off_the_request_path(service):
+    # Enough history to overflow the default budget
+    chars = (CONTEXT_TOKENS - SUMMARY_TOKENS) * 4 // 6
+    messages = turns(8, chars)
+    conversation = service.conversation("s1")
+
+    started = time.perf_counter()
+    sent = service.build_request("key", "s1", messages, instruction=None)
+    assert time.perf_counter() - started < 0.4
+    assert sent == [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    # The conversation is not locked while the summarizer runs
+    assert conversation.context_state["summarizing"]
+    locked = threading.Event()
+
+    def lock():
+        if conversation.lock.acquire(timeout=0.1):
+            locked.set()
+            conversation.lock.release()
+
+    thread = threading.Thread(target=lock)
+    thread.start()
+    thread.join()
+    assert locked.is_set()
+
+    for _ in range(100):
+        if not conversation.context_state["summarizing"]:
+            break
+        time.sleep(0.02)
+    upto = conversation.context_state["summarized_upto"]
+    assert 0 < upto < len(messages)
+    assert service.stub.llm.requests == 1
+
+    sent = service.build_request("key", "s1", messages, instruction=None)
+    assert sent[0]["content"].startswith("Summary of the earlier conversation:\n")
+    assert sent[1:] == messages[upto:]
+    assert service.stub.llm.requests == 1
+    assert service.ledger.session_stats("s1")["tools"]["Summary"]["turns"] == 1
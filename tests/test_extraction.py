@@ -0,0 +1,36 @@
+import pytest
+
+from learner import extraction
+
+pytest.importorskip("PyPDF2")
+from benchmarks.bench_ingest import build_pdf  # noqa: E402
+
+
+def test_worker_processes_do_not_fork_the_server(monkeypatch):
+    assert extraction.PDF_START_METHOD != "fork"
+    monkeypatch.setattr(extraction, "PDF_PARALLEL_MIN_PAGES", 1)
+    pdf = build_pdf(12, lines_per_page=4)
+    assert extraction.extract_pdf_text(pdf, processes=2) == extraction.extract_pdf_text(pdf, processes=0)
+    batches = list(extraction.iter_pdf_batches(pdf, 5, processes=2))
+    assert [(done, count) for _, done, count in batches] == [(5, 12), (10, 12), (12, 12)]
+
+
+@pytest.mark.parametrize("data", [
+    "Week 1: café culture".encode("utf-8"),
+    "Week 1: café culture".encode("utf-8-sig"),
+    "Week 1: café culture".encode("utf-16"),
+    "Week 1: café culture".encode("cp1252"),
+])
+def test_text_files_decode_whatever_their_encoding(data):
+    assert extraction.extract_text(data, "text/plain", "syllabus.txt") == "Week 1: café culture"
+
+
+def test_undecodable_bytes_are_replaced():
+    assert extraction.extract_text(b"caf\xe9 \x81", "text/plain") == "café �"
+
+
+@pytest.mark.parametrize("mime, name", [("application/msword", "notes.doc"),
+                                        ("application/octet-stream", "notes.doc")])
+def test_legacy_word_files_are_unsupported(mime, name):
+    with pytest.raises(extraction.UnsupportedFileType):
+        extraction.extract_text(b"\xd0\xcf\x11\xe0", mime, name)
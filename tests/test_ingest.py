@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+from learner import retrieval
+from learner.extraction import extraction_cache_stats
+from learner.ingest import IngestQueue
+from learner.service import Upload
+
+SYLLABUS = b"Week 1: photosynthesis and chlorophyll\nWeek 2: the Calvin cycle\n"
+
+
+def ingest(upload):
+    job = IngestQueue(workers=1).submit(upload)
+    assert job.wait(5)
+    return job
+
+
+def test_evicted_index_is_rebuilt_from_the_cached_text(monkeypatch):
+    first = ingest(Upload(SYLLABUS + b"Week 3: respiration\n", "text/plain", "week3.txt"))
+    assert first.status == "done"
+    monkeypatch.setattr(retrieval, "_indexes", type(retrieval._indexes)())
+
+    def parse_again(*args, **kwargs):
+        raise AssertionError("the upload was parsed again")
+
+    monkeypatch.setattr("learner.ingest.iter_extracted", parse_again)
+    hits = extraction_cache_stats()["hits"]
+    again = ingest(Upload(SYLLABUS + b"Week 3: respiration\n", "text/plain", "week3.txt"))
+    assert again.status == "done"
+    assert again.index.chunks == first.index.chunks
+    assert extraction_cache_stats()["hits"] == hits + 1
+
+
+def empty_docx() -> bytes:
+    docx = pytest.importorskip("docx")
+    out = io.BytesIO()
+    docx.Document().save(out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("name", ["empty.txt", "empty.docx"])
+def test_empty_files_are_not_called_pdfs(name):
+    data = empty_docx() if name.endswith(".docx") else b""
+    job = ingest(Upload(data, "application/octet-stream", name))
+    assert job.status == "done"
+    assert job.index.chunks == ["No extractable text found in file."]
+
+
+def test_failed_job_is_retried_when_the_file_comes_again():
+    queue = IngestQueue(workers=1)
+    broken = Upload(b"%PDF-1.4 truncated", "application/pdf", "broken.pdf")
+    first = queue.submit(broken)
+    assert first.wait(5) and first.status == "failed"
+    again = queue.submit(broken)
+    assert again is not first
+    assert again.wait(5) and again.status == "failed"
+    assert queue.stats()["jobs"] == 1
@@ -0,0 +1,31 @@
+import pytest
+
+from learner.llm_client import LLMError, MAX_RETRIES, chat_completion
+from learner.router import Backend, Router
+
+MESSAGES = [{"role": "user", "content": "What is osmosis?"}]
+
+
+def test_retries_server_errors_then_gives_up(stub_server):
+    server = stub_server(error_rate=1.0, error_status=503)
+    with pytest.raises(LLMError) as error:
+        chat_completion("key", MESSAGES, "stub", server.url)
+    assert error.value.status_code == 503
+    assert server.llm.requests == MAX_RETRIES + 1
+
+
+def test_recovers_after_a_transient_failure(stub_server):
+    server = stub_server()
+    failures = iter([503])
+    server.llm.failure = lambda: next(failures, None)
+    assert chat_completion("key", MESSAGES, "stub", server.url).endswith("**Current Concept:** [What is osmosis?]")
+
+
+def test_router_fails_over_instead_of_retrying(stub_server):
+    down = stub_server(error_rate=1.0, error_status=503)
+    up = stub_server()
+    router = Router([Backend("down", down.url, "stub"), Backend("up", up.url, "stub")], hedge_percentile=None)
+    assert router.complete("key", MESSAGES).endswith("**Current Concept:** [What is osmosis?]")
+    # One attempt at the failing backend, then straight to the next one
+    assert down.llm.requests == 1
+    assert up.llm.requests == 1
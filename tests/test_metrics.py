@@ -0,0 +1,92 @@
+import json
+import re
+
+import pytest
+
+from learner import metrics
+from learner.metrics import BUCKETS, Histogram, observe, prometheus_text, reset_metrics, span, stage_stats
+
+
+@pytest.fixture(autouse=True)
+def fresh():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def stats(stage):
+    return next(s for s in stage_stats() if s["stage"] == stage)
+
+
+def test_span_times_the_block_even_when_it_raises():
+    with span("llm"):
+        pass
+    with pytest.raises(ValueError):
+        with span("llm"):
+            raise ValueError("boom")
+    assert stats("llm")["count"] == 2
+
+
+def test_percentiles_come_from_recent_samples():
+    hist = Histogram(reservoir=100)
+    assert hist.percentiles() == {"p50": None, "p95": None, "p99": None}
+    for ms in range(1, 201):
+        hist.observe(ms / 1000)
+    # Only the last 100 samples (101..200 ms) are kept
+    assert hist.percentiles() == {"p50": 151.0, "p95": 196.0, "p99": 200.0}
+    assert hist.count == 200
+
+
+def test_stage_stats():
+    observe("prompt", 0.010)
+    observe("prompt", 0.030)
+    assert stage_stats() == [{"stage": "prompt", "count": 2, "mean": 20.0, "p50": 30.0, "p95": 30.0, "p99": 30.0}]
+
+
+def test_prometheus_histogram_format():
+    observe("llm", 0.003)
+    observe("llm", 0.2)
+    observe("llm", 60)
+    observe("extract", 0.001)
+    text = prometheus_text()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert lines[:2] == ["# HELP learner_stage_seconds Time spent in each stage of a chat turn",
+                         "# TYPE learner_stage_seconds histogram"]
+    sample = re.compile(r'learner_stage_seconds_(bucket|sum|count)\{stage="[a-z_]+"(,le="[^"]+")?\} \S+')
+    assert all(sample.fullmatch(line) for line in lines[2:])
+
+    llm = {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in lines if 'stage="llm"' in line}
+    buckets = [llm[f'learner_stage_seconds_bucket{{stage="llm",le="{bound}"}}'] for bound in list(BUCKETS) + ["+Inf"]]
+    # Cumulative, ending at the total count
+    assert buckets == sorted(buckets)
+    assert buckets[:2] == [0, 1]
+    assert llm['learner_stage_seconds_bucket{stage="llm",le="0.25"}'] == 2
+    assert llm['learner_stage_seconds_bucket{stage="llm",le="30.0"}'] == 2
+    assert buckets[-1] == llm['learner_stage_seconds_count{stage="llm"}'] == 3
+    assert llm['learner_stage_seconds_sum{stage="llm"}'] == pytest.approx(60.203)
+    # Stages are listed in name order
+    assert text.index('stage="extract"') < text.index('stage="llm"')
+
+
+def test_spans_are_appended_as_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(metrics, "METRICS_JSONL", str(path))
+    monkeypatch.setattr(metrics, "_jsonl", None)
+    with span("render"):
+        pass
+    with pytest.raises(RuntimeError):
+        with span("llm"):
+            raise RuntimeError
+    metrics._jsonl.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["stage"], r["error"]) for r in records] == [("render", False), ("llm", True)]
+    assert all(r["ms"] >= 0 for r in records)
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS", False)
+    with span("llm"):
+        pass
+    observe("llm", 1.0)
+    assert stage_stats() == []
@@ -0,0 +1,27 @@
+from learner.llm_client import DEFAULT_MODEL
+from learner.prompts import build_messages, for_model, supports_system_role
+
+HISTORY = [
+    {"role": "system", "content": "Summary of the earlier conversation:\nleaves"},
+    {"role": "user", "content": "What is chlorophyll?"},
+]
+
+
+def test_default_model_gets_system_messages_folded():
+    assert not supports_system_role(DEFAULT_MODEL)
+    messages = for_model(build_messages(HISTORY, "Be a tutor", cache_prefix=True), DEFAULT_MODEL)
+    assert [m["role"] for m in messages] == ["user"]
+    assert messages[0]["content"] == "Be a tutor\n\nSummary of the earlier conversation:\nleaves\n\nWhat is chlorophyll?"
+
+
+def test_models_with_a_system_role_keep_the_cacheable_prefix():
+    messages = for_model(build_messages(HISTORY, "Be a tutor", cache_prefix=True), "openai/gpt-4o-mini")
+    assert [m["role"] for m in messages] == ["system", "system", "user"]
+    assert messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_system_role_override(monkeypatch):
+    monkeypatch.setattr("learner.prompts.SYSTEM_ROLE", "1")
+    assert supports_system_role(DEFAULT_MODEL)
+    monkeypatch.setattr("learner.prompts.SYSTEM_ROLE", "0")
+    assert not supports_system_role("openai/gpt-4o-mini")
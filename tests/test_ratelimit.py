@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from learner import ratelimit
+from learner.llm_client import chat_completion
+from learner.ratelimit import RateLimitExceeded, TokenBucket, limiter_for
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    # Two from the burst, the third after one refill interval
+    assert 0.08 <= time.monotonic() - start < 0.5
+
+
+def test_bucket_refuses_waits_past_the_limit():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(max_wait=0.1)
+    # The refused reservation was given back
+    assert bucket._tokens == pytest.approx(0.0, abs=0.2)
+
+
+def test_zero_rate_disables_the_bucket():
+    bucket = TokenBucket(rate=0.0, burst=1)
+    start = time.monotonic()
+    for _ in range(50):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_each_api_key_has_its_own_bucket(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_RPM", 60.0)
+    url = "http://limits.example/v1/chat/completions"
+    assert limiter_for(url, "Bearer key-a") is limiter_for(url, "Bearer key-a")
+    assert limiter_for(url, "Bearer key-a") is not limiter_for(url, "Bearer key-b")
+    assert limiter_for(url, "Bearer key-a") is not limiter_for("http://other.example/", "Bearer key-a")
+
+
+def test_one_students_burst_does_not_queue_another_key(monkeypatch, stub_server):
+    # 1 request per second per key, no burst beyond the first
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_RPM", 60.0)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_BURST", 1.0)
+    server = stub_server()
+    messages = [{"role": "user", "content": "hello"}]
+    busy = threading.Thread(target=lambda: [chat_completion("key-busy", messages, "stub", server.url)
+                                            for _ in range(3)])
+    busy.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    chat_completion("key-other", messages, "stub", server.url)
+    elapsed = time.monotonic() - start
+    busy.join()
+    assert elapsed < 0.5
+    assert server.llm.requests == 4
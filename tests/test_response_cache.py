@@ -0,0 +1,86 @@
+import pytest
+
+from learner import response_cache as response_cache_module
+from learner.response_cache import MemoryBackend, ResponseCache, SQLiteBackend, cache_from_spec, cache_key
+
+MESSAGES = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "What is ATP?"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock that only moves when the test moves it"""
+    now = [1000.0]
+
+    class Clock:
+        @staticmethod
+        def time():
+            now[0] += 0.001
+            return now[0]
+
+        @staticmethod
+        def advance(seconds):
+            now[0] += seconds
+
+    monkeypatch.setattr(response_cache_module, "time", Clock)
+    return Clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "cache.db"))
+
+
+def test_key_ignores_whitespace_but_not_model_or_roles():
+    key = cache_key("m", MESSAGES)
+    spaced = [{"role": "system", "content": "Be   brief.\n"}, {"role": "user", "content": " What is ATP?"}]
+    parts = [MESSAGES[0], {"role": "user", "content": [{"type": "text", "text": "What is ATP?"}]}]
+    assert cache_key("m", spaced) == key
+    assert cache_key("m", parts) == key
+    assert cache_key("other", MESSAGES) != key
+    assert cache_key("m", [{"role": "user", "content": "Be brief."}, MESSAGES[1]]) != key
+
+
+def test_hits_and_misses(backend, clock):
+    cache = ResponseCache(backend, ttl=60, max_entries=10)
+    assert cache.get("m", MESSAGES) is None
+    cache.put("m", MESSAGES, "Energy currency")
+    assert cache.get("m", MESSAGES) == "Energy currency"
+    assert cache.get("other", MESSAGES) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_entries_expire(backend, clock):
+    cache = ResponseCache(backend, ttl=60, max_entries=10)
+    cache.put("m", MESSAGES, "Energy currency")
+    clock.advance(61)
+    assert cache.get("m", MESSAGES) is None
+    assert len(backend) == 0
+
+
+def test_least_recently_used_is_evicted(backend, clock):
+    cache = ResponseCache(backend, ttl=60, max_entries=2)
+    first, second, third = ([{"role": "user", "content": f"Question {i}"}] for i in range(3))
+    cache.put("m", first, "1")
+    cache.put("m", second, "2")
+    # Reading the first makes the second the oldest
+    assert cache.get("m", first) == "1"
+    cache.put("m", third, "3")
+    assert len(backend) == 2
+    assert cache.get("m", second) is None
+    assert cache.get("m", first) == "1" and cache.get("m", third) == "3"
+
+
+def test_sqlite_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(SQLiteBackend(path)).put("m", MESSAGES, "Energy currency")
+    assert ResponseCache(SQLiteBackend(path)).get("m", MESSAGES) == "Energy currency"
+
+
+def test_cache_from_spec(tmp_path):
+    assert cache_from_spec("") is None
+    assert isinstance(cache_from_spec("memory").backend, MemoryBackend)
+    assert isinstance(cache_from_spec(f"sqlite:{tmp_path / 'c.db'}").backend, SQLiteBackend)
+    with pytest.raises(ValueError):
+        cache_from_spec("redis://localhost")
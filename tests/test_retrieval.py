@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("numpy")
+from learner.retrieval import SyllabusIndex, chunk_text, format_excerpts, tokenize  # noqa: E402
+
+CHUNKS = [
+    "Week 1: cell structure, the membrane and organelles",
+    "Week 2: photosynthesis, chlorophyll and the light reactions",
+    "Week 3: cellular respiration and ATP",
+    "Week 4: photosynthesis review; photosynthesis in C4 plants",
+    "Week 5: genetics and inheritance",
+]
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("What is the Role of ATP in a cell?") == ["role", "atp", "cell"]
+
+
+def test_chunks_overlap_and_break_on_lines():
+    text = "".join(f"line {i:02d} " + "x" * 30 + "\n" for i in range(20))
+    chunks = chunk_text(text, chunk_chars=200, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    # Each chunk starts on a line and repeats the tail of the one before it
+    assert all(chunk.startswith("line ") for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.splitlines()[0] in previous
+    assert chunks[-1].endswith("line 19 " + "x" * 30)
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity():
+    index = SyllabusIndex(CHUNKS)
+    hits = index.search("photosynthesis")
+    assert [i for i, _ in hits] == [3, 1]
+    assert hits[0][1] > hits[1][1] > 0
+    # A rare term outweighs a common one
+    assert index.search("photosynthesis genetics", k=1)[0][0] == 4
+    assert index.search("quantum") == []
+
+
+def test_excerpts_are_the_best_chunks_in_document_order():
+    index = SyllabusIndex(CHUNKS)
+    assert index.top_chunks("ATP and chlorophyll", k=2) == [CHUNKS[1], CHUNKS[2]]
+    # Nothing matches: the opening of the syllabus
+    assert index.top_chunks("quantum", k=2) == CHUNKS[:2]
+    assert format_excerpts(CHUNKS[:2]) == (
+        "Relevant excerpts from the attached syllabus:\n\n" + CHUNKS[0] + "\n\n---\n\n" + CHUNKS[1]
+    )
+
+
+def test_empty_syllabus_has_no_hits():
+    index = SyllabusIndex([])
+    assert index.search("cells") == []
+    assert index.top_chunks("cells") == []
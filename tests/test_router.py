@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from learner.llm_client import LLMError
+from learner.router import ROUTER_WORKERS, Backend, Router
+
+MESSAGES = [{"role": "user", "content": "What is diffusion?"}]
+
+
+def backend(server, name):
+    return Backend(name, server.url, "stub")
+
+
+def test_requests_go_to_the_fastest_backend(stub_server):
+    slow, fast = stub_server(latency=0.2), stub_server(latency=0.01)
+    router = Router([backend(slow, "slow"), backend(fast, "fast")], hedge_percentile=None)
+    for _ in range(6):
+        router.complete("key", MESSAGES)
+    # Each is measured once, then the faster one takes the traffic
+    assert slow.llm.requests == 1
+    assert fast.llm.requests == 5
+    assert [b.name for b in router.ranked()] == ["fast", "slow"]
+
+
+def test_slow_primary_is_hedged_to_the_next_backend(stub_server):
+    primary_server, secondary_server = stub_server(latency=0.01), stub_server(latency=0.01)
+    primary, secondary = backend(primary_server, "primary"), backend(secondary_server, "secondary")
+    for _ in range(20):
+        primary.record(0.02, False)
+    secondary.record(0.05, False)
+    router = Router([primary, secondary], hedge_percentile=95)
+    # The primary now answers far slower than its own p95
+    primary_server.llm.latency = 1.0
+    start = time.perf_counter()
+    router.complete("key", MESSAGES)
+    assert time.perf_counter() - start < 0.5
+    assert router.stats()["hedged"] == 1 and router.stats()["hedge_wins"] == 1
+    assert primary_server.llm.requests == 1 and secondary_server.llm.requests == 1
+
+
+def test_stream_fails_over_before_the_first_token(stub_server):
+    down, up = stub_server(error_rate=1.0), stub_server()
+    router = Router([backend(down, "down"), backend(up, "up")], hedge_percentile=None)
+    reply = "".join(router.stream("key", MESSAGES))
+    assert reply.endswith("[What is diffusion?]")
+    assert down.llm.requests == 1 and up.llm.requests == 1
+    assert router.stats()["backends"][0]["failures"] == 1
+
+
+def test_executor_size_is_configurable(stub_server):
+    server = stub_server()
+    assert Router([backend(server, "stub")])._executor._max_workers == ROUTER_WORKERS
+    assert Router([backend(server, "stub")], max_workers=2)._executor._max_workers == 2
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_backend_faults_fail_over(stub_server, status):
+    down, up = stub_server(error_rate=1.0, error_status=status), stub_server()
+    router = Router([backend(down, "down"), backend(up, "up")], hedge_percentile=None)
+    assert router.complete("key", MESSAGES).endswith("[What is diffusion?]")
+    assert down.llm.requests == 1 and up.llm.requests == 1
+
+
+@pytest.mark.parametrize("status", [400, 401, 403])
+def test_client_errors_are_raised_without_failover(stub_server, status):
+    refused, spare = stub_server(error_rate=1.0, error_status=status), stub_server()
+    router = Router([backend(refused, "refused"), backend(spare, "spare")], hedge_percentile=None)
+    with pytest.raises(LLMError) as error:
+        router.complete("key", MESSAGES)
+    assert error.value.status_code == status
+    with pytest.raises(LLMError):
+        "".join(router.stream("key", MESSAGES))
+    assert refused.llm.requests == 2 and spare.llm.requests == 0
+    # The request was at fault, not the backend
+    assert router.stats()["backends"][0]["failures"] == 0
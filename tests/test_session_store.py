@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+from learner import session_store as session_store_module
+from learner.service import TutorService
+from learner.session_store import SQLiteSessionBackend, WriteBehindStore, set_session_store, store_from_spec
+
+
+class RecordingBackend(SQLiteSessionBackend):
+    """SQLite backend that counts batches and loads"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.batches = []
+        self.loads = 0
+        self.written = threading.Event()
+
+    def write_batch(self, events):
+        super().write_batch(events)
+        self.batches.append(len(events))
+        self.written.set()
+
+    def load(self, session_id):
+        self.loads += 1
+        return super().load(session_id)
+
+
+def message(role, content):
+    return {"role": role, "content": content, "timestamp": "12:00:00"}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return RecordingBackend(str(tmp_path / "sessions.db"))
+
+
+@pytest.fixture
+def installed(backend):
+    """A slow-flushing store installed as the process-wide one"""
+    previous = session_store_module._store
+    store = WriteBehindStore(backend, flush_interval=60)
+    set_session_store(store)
+    yield store
+    set_session_store(previous)
+
+
+def test_appends_are_buffered_until_flushed(backend):
+    store = WriteBehindStore(backend, flush_interval=60)
+    store.append("s1", message("user", "Hi"))
+    store.append("s1", message("assistant", "Hello"))
+    assert backend.batches == [] and store.pending() == 2
+
+    store.flush()
+    assert backend.batches == [2] and store.pending() == 0
+    assert store.events_written == 2 and store.batches_written == 1
+    store.flush()
+    assert backend.batches == [2]
+
+
+def test_full_batch_wakes_the_writer(backend):
+    store = WriteBehindStore(backend, flush_interval=60, batch_size=3)
+    for i in range(3):
+        store.append("s1", message("user", str(i)))
+    assert backend.written.wait(2)
+    assert sum(backend.batches) == 3
+
+
+def test_load_sees_events_not_yet_written(backend):
+    store = WriteBehindStore(backend, flush_interval=60)
+    store.append("s1", message("user", "Hi"))
+    assert store.load("s1") == [message("user", "Hi")]
+    assert store.load("s2") == []
+
+
+def test_failed_write_is_kept_and_retried_in_order(backend, monkeypatch):
+    store = WriteBehindStore(backend, flush_interval=60)
+    store.append("s1", message("user", "first"))
+
+    def full(events):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "write_batch", full)
+    with pytest.raises(OSError):
+        store.flush()
+    monkeypatch.undo()
+    store.append("s1", message("user", "second"))
+    assert [m["content"] for m in store.load("s1")] == ["first", "second"]
+
+
+def test_clear_hides_earlier_messages_but_keeps_later_ones(backend):
+    store = WriteBehindStore(backend, flush_interval=60)
+    store.append("s1", message("user", "old"))
+    store.append("s2", message("user", "other session"))
+    store.clear("s1")
+    store.append("s1", message("user", "new"))
+    assert [m["content"] for m in store.load("s1")] == ["new"]
+    assert [m["content"] for m in store.load("s2")] == ["other session"]
+
+
+def test_history_is_rehydrated_once_after_a_restart(installed, backend):
+    TutorService().add_message("s1", [], "user", "Hi")
+    installed.flush()
+
+    # A new process: nothing in memory, the history is read on first use only
+    service = TutorService()
+    messages = service.history("s1")
+    assert [m["content"] for m in messages] == ["Hi"]
+    service.add_message("s1", messages, "assistant", "Hello")
+    assert service.history("s1") is messages
+    assert backend.loads == 1
+
+
+def test_service_clear_forgets_the_history_and_derived_state(installed, backend):
+    service = TutorService()
+    messages = service.history("s1")
+    service.add_message("s1", messages, "user", "Hi")
+    conversation = service.conversation("s1")
+    service.clear("s1")
+    assert service.conversation("s1") is not conversation
+    assert service.history("s1") == []
+    assert backend.loads == 2
+
+
+def test_store_from_spec(tmp_path):
+    assert store_from_spec("") is None
+    assert isinstance(store_from_spec(f"sqlite:{tmp_path / 's.db'}").backend, SQLiteSessionBackend)
+    with pytest.raises(ValueError):
+        store_from_spec("redis://localhost")
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from learner import router as router_module
+from learner.response_cache import MemoryBackend, ResponseCache, get_response_cache, set_response_cache
+from learner.router import Backend, Router
+from learner.service import TutorService
+from learner.usage import TokenBudgetExceeded, TokenLedger
+
+MESSAGES = [{"role": "user", "content": "Summarize the water cycle"}]
+
+
+@pytest.fixture
+def service(stub_server):
+    """A service with its own ledger, answering from a stub LLM"""
+    previous = router_module._router
+    server = stub_server(latency=0.2)
+    router_module.set_router(Router([Backend("stub", server.url, "stub")], hedge_percentile=None))
+    service = TutorService()
+    service.ledger = TokenLedger()
+    service.stub = server
+    yield service
+    router_module.set_router(previous)
+
+
+@pytest.fixture
+def response_cache():
+    previous = get_response_cache()
+    cache = ResponseCache(MemoryBackend())
+    set_response_cache(cache)
+    yield cache
+    set_response_cache(previous)
+
+
+def totals(service, session_id):
+    return service.ledger.session_stats(session_id)["totals"]
+
+
+def test_upstream_calls_are_booked_with_the_reported_usage(service):
+    service.complete("key", "paid", MESSAGES)
+    paid = totals(service, "paid")
+    assert paid["prompt_tokens"] > 0 and paid["completion_tokens"] == 11
+    assert paid["cached"] == 0 and paid["coalesced"] == 0
+    assert service.ledger.used("paid") == paid["total_tokens"]
+
+
+def test_response_cache_hits_are_booked_at_zero_tokens(service, response_cache):
+    first = service.complete("key", "first", MESSAGES)
+    assert "".join(service.stream("key", "second", MESSAGES)) == first
+    assert service.complete("key", "second", MESSAGES) == first
+    assert service.stub.llm.requests == 1 and response_cache.hits == 2
+    second = totals(service, "second")
+    assert second["total_tokens"] == 0 and second["cached"] == 2 and second["turns"] == 2
+    assert totals(service, "first")["total_tokens"] > 0
+
+
+def test_coalesced_followers_are_booked_at_zero_tokens(service):
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda sid: service.complete("key", sid, MESSAGES), ["a", "b"]))
+    booked = sorted([totals(service, "a"), totals(service, "b")], key=lambda t: t["total_tokens"])
+    assert booked[0]["total_tokens"] == 0 and booked[0]["coalesced"] == 1
+    assert booked[1]["total_tokens"] > 0 and booked[1]["coalesced"] == 0
+
+
+def test_budget_counts_only_tokens_sent_upstream(service, response_cache):
+    service.complete("key", "paid", MESSAGES)
+    budget = service.ledger.used("paid") + 5
+    with pytest.raises(TokenBudgetExceeded):
+        service.ledger.check_budget("paid", MESSAGES, budget=budget)
+    # Answers from the cache cost the session nothing, however many it gets
+    for _ in range(5):
+        service.complete("key", "reader", MESSAGES)
+    assert service.ledger.used("reader") == 0
+    service.ledger.check_budget("reader", MESSAGES, budget=budget)